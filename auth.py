@@ -1,11 +1,4 @@
-import os
-from dotenv import load_dotenv
-
-load_dotenv()  # Load environment variables from .env file
-
-# Login credentials
-EMAIL = os.environ['UPWORK_EMAIL'] or os.getenv('UPWORK_EMAIL')
-PASSWORD = os.environ['UPWORK_PASSWORD'] or os.getenv('UPWORK_PASSWORD')
+from config import config
 
 def login(sb):
     """
@@ -30,7 +23,7 @@ def login(sb):
         # Enter email
         sb.assert_element("#login_username", timeout=10)
         print("Entering email...")
-        sb.type("#login_username", EMAIL)
+        sb.type("#login_username", config.upwork_email)
         
         # Click continue button after email
         print("Clicking continue button after email...")
@@ -40,7 +33,7 @@ def login(sb):
         # Enter password
         sb.assert_element("#login_password", timeout=10)
         print("Entering password...")
-        sb.type("#login_password", PASSWORD)
+        sb.type("#login_password", config.upwork_password)
         
         # Check "Keep me logged in" checkbox
         print("Checking 'Keep me logged in' checkbox...")
@@ -62,7 +55,7 @@ def login(sb):
             # Enter mother's maiden name
             sb.assert_element("#login_answer", timeout=10)
             print("Entering mother's maiden name...")
-            sb.type("#login_answer", os.environ["UPWORK_SECURITY_QUESTION_ANSWER"])  
+            sb.type("#login_answer", config.upwork_security_answer)  
             
             # Check "Remember this device" if present
             try:
@@ -0,0 +1,423 @@
+import os
+import signal
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+try:
+    import psutil
+except ImportError:  # optional dependency, /proc is read directly without it
+    psutil = None
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _proc_children():
+    """
+    Map every pid to its child pids by scanning /proc.
+    """
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r") as f:
+                # The command name may contain spaces, so split after its closing parenthesis
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    return children
+
+
+def _proc_rss(pid):
+    try:
+        with open(f"/proc/{pid}/statm", "r") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+def _proc_pss(pid):
+    """
+    Read a process's PSS from smaps_rollup, falling back to RSS on kernels without it.
+    """
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, IndexError, ValueError):
+        pass
+    return _proc_rss(pid)
+
+
+def process_tree(root_pids):
+    """
+    Return the given pids plus all their descendants that are still alive.
+    """
+    if psutil:
+        pids = set()
+        for pid in root_pids:
+            try:
+                process = psutil.Process(pid)
+                pids.add(pid)
+                pids.update(child.pid for child in process.children(recursive=True))
+            except psutil.Error:
+                continue
+        return pids
+    if not os.path.isdir("/proc"):
+        return set()
+    children = _proc_children()
+    pids, stack = set(), list(root_pids)
+    while stack:
+        pid = stack.pop()
+        if pid in pids or not os.path.exists(f"/proc/{pid}"):
+            continue
+        pids.add(pid)
+        stack.extend(children.get(pid, []))
+    return pids
+
+
+def tree_pss(root_pids):
+    """
+    Sum the PSS of a process tree in bytes.
+
+    Chrome processes share most of their pages, so summing RSS counts those
+    pages once per process. PSS splits each shared page between the processes
+    that map it, so the sum is the memory the tree really uses.
+    """
+    total = 0
+    for pid in process_tree(root_pids):
+        if psutil:
+            try:
+                info = psutil.Process(pid).memory_full_info()
+            except psutil.Error:
+                continue
+            # pss is only reported on Linux
+            total += getattr(info, "pss", None) or getattr(info, "uss", None) or info.rss
+        else:
+            total += _proc_pss(pid)
+    return total
+
+
+class BrowserSupervisor:
+    def __init__(self, sb_kwargs, max_pss_mb=1500, max_age_seconds=1800, max_pages=50,
+                 hang_timeout=30, step_timeout=180, sample_interval=2, max_restarts=3, on_start=None):
+        """
+        Initialize the browser supervisor.
+
+        The supervisor owns the SB session. A background thread samples the
+        PSS of the Chrome process tree every sample_interval seconds and acts
+        as a watchdog: a step run through run() or watch() that makes no
+        progress for step_timeout seconds gets its browser killed, which
+        unblocks the hung driver call. At every check() the session is
+        recycled, carrying its cookies over, once memory, age or page count
+        cross their limits, and a crashed or hung driver is restarted.
+
+        Args:
+            sb_kwargs: Keyword arguments for SB()
+            max_pss_mb: PSS of the browser process tree that triggers a recycle
+            max_age_seconds: Session age that triggers a recycle
+            max_pages: Page loads that trigger a recycle
+            hang_timeout: Seconds the driver may take to answer a ping at check()
+            step_timeout: Seconds a watched step may run without progress before the browser is killed
+            sample_interval: Seconds between background memory samples
+            max_restarts: Crash restarts allowed before giving up
+            on_start: Callable run with the new sb after every recycle or restart
+        """
+        self.sb_kwargs = sb_kwargs
+        self.max_pss = max_pss_mb * 1024 * 1024
+        self.max_age_seconds = max_age_seconds
+        self.max_pages = max_pages
+        self.hang_timeout = hang_timeout
+        self.step_timeout = step_timeout
+        self.sample_interval = sample_interval
+        self.max_restarts = max_restarts
+        self.on_start = on_start
+        self.sb = None
+        self._context = None
+        self.cookies = []
+        self.url = None
+        self.restarts = 0
+        self.hangs = 0
+        self.cycles = []
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._watchdog = None
+        self._step = None
+        self._step_progress = 0.0
+
+    def __enter__(self):
+        self.start()
+        self._stopping.clear()
+        self._watchdog = threading.Thread(target=self._watch, daemon=True)
+        self._watchdog.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._stopping.set()
+        self._watchdog.join(self.sample_interval + self.hang_timeout)
+        self.stop("finished")
+        self.report()
+        return False
+
+    @property
+    def cycle(self):
+        return self.cycles[-1]
+
+    def start(self):
+        from seleniumbase import SB
+
+        self._context = SB(**self.sb_kwargs)
+        self.sb = self._context.__enter__()
+        with self._lock:
+            self.cycles.append({
+                "started_at": time.time(),
+                "pages": 0,
+                "peak_pss": 0,
+                "samples": 0,
+                "ended_by": None,
+            })
+        return self.sb
+
+    def stop(self, reason):
+        if self._context is None:
+            return
+        self.sample()
+        self.cycle["ended_by"] = reason
+        context, self._context = self._context, None
+
+        def quit_browser():
+            try:
+                context.__exit__(None, None, None)
+            except Exception as e:
+                print(f"Error closing browser: {e}")
+
+        # Quitting a hung driver can block too, so it gets the same timeout as other calls
+        thread = threading.Thread(target=quit_browser, daemon=True)
+        thread.start()
+        thread.join(self.hang_timeout)
+        if thread.is_alive():
+            print("Browser did not quit in time, killing it")
+            self.kill()
+
+    def driver_pids(self):
+        """
+        Pids of chromedriver and, in UC mode, the Chrome it attached to.
+        """
+        driver = getattr(self.sb, "driver", None)
+        pids = []
+        service = getattr(driver, "service", None)
+        process = getattr(service, "process", None)
+        if process is not None:
+            pids.append(process.pid)
+        browser_pid = getattr(driver, "browser_pid", None)
+        if browser_pid:
+            pids.append(browser_pid)
+        return pids
+
+    def root_pids(self):
+        """
+        Pids whose process trees are measured, falling back to this process's children.
+        """
+        return self.driver_pids() or [pid for pid in process_tree([os.getpid()]) if pid != os.getpid()]
+
+    def kill(self):
+        # Only the driver's own trees are killed, never other children such as the virtual display
+        for pid in process_tree(self.driver_pids()):
+            if pid == os.getpid():
+                continue
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except OSError:
+                continue
+
+    def sample(self):
+        """
+        Sample the PSS of the browser process tree and update the cycle peak.
+
+        Returns:
+            int: Current PSS in bytes
+        """
+        pss = tree_pss(self.root_pids())
+        with self._lock:
+            if self.cycles:
+                self.cycle["peak_pss"] = max(self.cycle["peak_pss"], pss)
+                self.cycle["samples"] += 1
+        return pss
+
+    def _watch(self):
+        """
+        Background loop: sample memory and kill the browser when a watched step hangs.
+        """
+        while not self._stopping.wait(self.sample_interval):
+            try:
+                self.sample()
+            except Exception as e:
+                print(f"Error sampling browser memory: {e}")
+            step = self._step
+            if step and time.time() - self._step_progress > self.step_timeout:
+                self.hangs += 1
+                print(f"Browser made no progress in '{step}' for {self.step_timeout}s, killing it")
+                # The next driver call fails instead of blocking, and run() or check() restarts the browser
+                self._step = None
+                self.kill()
+
+    @contextmanager
+    def watch(self, step):
+        """
+        Let the watchdog kill the browser if this block makes no progress for step_timeout.
+
+        page_loaded() counts as progress, so a long multi-page block is only
+        killed when a single page hangs.
+        """
+        self._step_progress = time.time()
+        self._step = step
+        try:
+            yield
+        finally:
+            self._step = None
+
+    def run(self, step, func, *args, **kwargs):
+        """
+        Run func(sb, *args, **kwargs) under the watchdog, restarting the
+        browser and retrying once if it hung or crashed during the call.
+        """
+        for attempt in range(2):
+            hangs = self.hangs
+            try:
+                with self.watch(step):
+                    result = func(self.sb, *args, **kwargs)
+            except Exception as e:
+                if attempt or (self.hangs == hangs and self.is_responsive()):
+                    raise
+                print(f"Browser hung or crashed during '{step}': {e}")
+                self.restart()
+                continue
+            if self.hangs == hangs or attempt:
+                return result
+            # The call returned, but only because the watchdog killed the browser under it
+            self.restart()
+
+    def page_loaded(self, count=1):
+        self.cycle["pages"] += count
+        self._step_progress = time.time()
+
+    def after_pages(self, count):
+        """
+        Record page loads and check the session; meant as a per-wave hook.
+
+        Returns:
+            sb: The current SeleniumBase instance, which changes after a recycle
+        """
+        self.page_loaded(count)
+        return self.check()
+
+    def is_responsive(self):
+        """
+        Check that the driver answers a trivial script within hang_timeout.
+        """
+        result = {}
+
+        def ping():
+            try:
+                result["ok"] = self.sb.execute_script("return 1") == 1
+            except Exception as e:
+                result["error"] = e
+
+        thread = threading.Thread(target=ping, daemon=True)
+        thread.start()
+        thread.join(self.hang_timeout)
+        if thread.is_alive():
+            print(f"Driver did not respond within {self.hang_timeout}s")
+            return False
+        if "error" in result:
+            print(f"Driver is not responding: {result['error']}")
+            return False
+        return result.get("ok", False)
+
+    def check(self):
+        """
+        Recycle or restart the session if needed. Call this between pages.
+
+        Returns:
+            sb: The current SeleniumBase instance, which changes after a recycle
+        """
+        if not self.is_responsive():
+            return self.restart()
+
+        self._save_cookies()
+        pss = self.sample()
+        age = time.time() - self.cycle["started_at"]
+        if pss > self.max_pss:
+            return self.recycle(f"pss {pss / 1024 / 1024:.0f} MB")
+        if age > self.max_age_seconds:
+            return self.recycle(f"age {age:.0f}s")
+        if self.cycle["pages"] >= self.max_pages:
+            return self.recycle(f"{self.cycle['pages']} pages")
+        return self.sb
+
+    def _save_cookies(self):
+        try:
+            self.cookies = self.sb.driver.get_cookies()
+            self.url = self.sb.get_current_url()
+        except Exception as e:
+            print(f"Error saving cookies: {e}")
+
+    def _restore(self):
+        """
+        Reopen the last page in the new session with the saved cookies.
+        """
+        url = self.url
+        if not url or not url.startswith("http"):
+            return
+        parsed = urlparse(url)
+        # Cookies can only be added for the domain that is currently open
+        self.sb.uc_open_with_reconnect(f"{parsed.scheme}://{parsed.netloc}/", 4)
+        for cookie in self.cookies:
+            # Chrome can report sameSite values that add_cookie rejects
+            if cookie.get("sameSite") not in ("Strict", "Lax", "None"):
+                cookie.pop("sameSite", None)
+            try:
+                self.sb.driver.add_cookie(cookie)
+            except Exception:
+                continue
+        self.sb.uc_open_with_reconnect(url, 4)
+
+    def recycle(self, reason):
+        print(f"Recycling browser session ({reason})")
+        self._save_cookies()
+        self.stop(f"recycled: {reason}")
+        self.start()
+        self._restore()
+        if self.on_start:
+            self.on_start(self.sb)
+        return self.sb
+
+    def restart(self):
+        """
+        Kill an unresponsive browser and start a new session with the last saved cookies.
+        """
+        if self.restarts >= self.max_restarts:
+            raise RuntimeError(f"Browser crashed or hung {self.restarts} times, giving up")
+        self.restarts += 1
+        print(f"Restarting crashed or hung browser (restart {self.restarts} of {self.max_restarts})")
+        self.kill()
+        self.stop("crashed")
+        self.start()
+        self._restore()
+        if self.on_start:
+            self.on_start(self.sb)
+        return self.sb
+
+    def report(self):
+        print("\nBrowser session report:")
+        for index, cycle in enumerate(self.cycles, 1):
+            age = time.time() - cycle["started_at"]
+            print(f"  cycle {index}: {cycle['pages']} pages, peak PSS {cycle['peak_pss'] / 1024 / 1024:.0f} MB "
+                  f"over {cycle['samples']} samples, {cycle['ended_by'] or f'running for {age:.0f}s'}")
+        if self.cycles:
+            peak = max(cycle["peak_pss"] for cycle in self.cycles)
+            print(f"  peak PSS overall: {peak / 1024 / 1024:.0f} MB, hangs: {self.hangs}, restarts: {self.restarts}")
@@ -0,0 +1,175 @@
+import time
+from proxy_pool import proxy_key
+from state import load_json, save_json_atomic, state_path
+
+DEFAULT_STATS_PATH = state_path("captcha_stats.json")
+
+# Evaluated in a single round trip so a check costs one execute_script call
+_DETECT_BODY = """
+const title = (document.title || '').toLowerCase();
+const titleMarkers = ['just a moment', 'attention required', 'verify you are human', 'checking your browser'];
+for (const marker of titleMarkers) {
+    if (title.includes(marker)) { return 'title: ' + marker; }
+}
+const response = document.querySelector('input[name="cf-turnstile-response"]');
+if (response && response.value) { return null; }
+const domMarkers = [
+    '#challenge-form', '#challenge-running', '#challenge-stage', '#cf-challenge-running',
+    '.cf-turnstile', 'div[id^="cf-chl-widget"]', 'input[name="cf-turnstile-response"]',
+];
+for (const selector of domMarkers) {
+    if (document.querySelector(selector)) { return 'dom: ' + selector; }
+}
+const frame = document.querySelector('iframe[src*="challenges.cloudflare.com"], iframe[title*="Cloudflare"]');
+if (frame) { return 'frame: ' + (frame.getAttribute('title') || 'challenges.cloudflare.com'); }
+return null;
+"""
+# A single-line IIFE: in CDP mode execute_script only strips "return" from the
+# last line, and a bare return inside the body would be an illegal top-level return
+DETECT_SCRIPT = "return (() => { " + " ".join(line.strip() for line in _DETECT_BODY.strip().splitlines()) + " })();"
+
+# Returned by detect_challenge when the page could not be checked
+UNKNOWN = "unknown"
+
+
+def detect_challenge(sb, checks=3, wait=1):
+    """
+    Check whether a Cloudflare/Turnstile challenge is shown on the current page.
+
+    A page that is still navigating (e.g. right after a captcha click) can
+    reject scripts, so a failed check is repeated after a short wait.
+
+    Args:
+        sb: SeleniumBase instance for browser interaction
+        checks: Number of times to try the check
+        wait: Seconds to wait between failed checks
+
+    Returns:
+        str: The marker that matched, None if no challenge is present,
+            or UNKNOWN if the page could not be checked
+    """
+    for check in range(checks):
+        try:
+            return sb.execute_script(DETECT_SCRIPT)
+        except Exception as e:
+            print(f"Error detecting captcha (check {check + 1} of {checks}): {e}")
+            if check + 1 < checks:
+                sb.sleep(wait)
+    return UNKNOWN
+
+
+class CaptchaStats:
+    def __init__(self, path=DEFAULT_STATS_PATH):
+        """
+        Initialize the per-proxy captcha statistics.
+
+        Args:
+            path: JSON file where the counters are persisted between runs
+        """
+        self.path = path
+        self.stats = load_json(self.path, {}, "captcha stats")
+
+    def record(self, proxy, challenged, solved=None, latency=None):
+        # Same keys as ProxyPool, so rotating-gateway proxies that differ only by username stay apart
+        entry = self.stats.setdefault(proxy_key(proxy) if proxy else "direct", {
+            "checks": 0,
+            "challenges": 0,
+            "solved": 0,
+            "failed": 0,
+            "solve_seconds": 0.0,
+        })
+        entry["checks"] += 1
+        if challenged:
+            entry["challenges"] += 1
+            if solved:
+                entry["solved"] += 1
+                entry["solve_seconds"] += latency or 0.0
+            else:
+                entry["failed"] += 1
+
+    def summary(self):
+        """
+        Derive challenge frequency, solve latency and success rate per proxy.
+
+        Returns:
+            dict: Mapping of proxy key to challenge_rate, success_rate and avg_solve_seconds
+        """
+        summary = {}
+        for key, entry in self.stats.items():
+            summary[key] = {
+                "checks": entry["checks"],
+                "challenge_rate": entry["challenges"] / entry["checks"] if entry["checks"] else 0.0,
+                "success_rate": entry["solved"] / entry["challenges"] if entry["challenges"] else None,
+                "avg_solve_seconds": entry["solve_seconds"] / entry["solved"] if entry["solved"] else None,
+            }
+        return summary
+
+    def report(self):
+        print("\nCaptcha report:")
+        for key, stats in self.summary().items():
+            success = f"{stats['success_rate']:.0%}" if stats['success_rate'] is not None else "n/a"
+            latency = f"{stats['avg_solve_seconds']:.1f}s" if stats['avg_solve_seconds'] is not None else "n/a"
+            print(f"  {key}: {stats['checks']} checks, challenge rate {stats['challenge_rate']:.0%}, "
+                  f"success rate {success}, avg solve {latency}")
+
+    def save(self):
+        save_json_atomic(self.path, self.stats, "captcha stats")
+
+
+def handle_captcha(sb, proxy=None, stats=None, pool=None, max_attempts=3, backoff=2):
+    """
+    Solve a captcha only if one is actually shown.
+
+    The GUI click path (pyautogui and a virtual display) is skipped entirely
+    when no challenge is detected. Otherwise it is retried up to max_attempts
+    times, waiting backoff * 2**attempt seconds after each click.
+
+    Args:
+        sb: SeleniumBase instance for browser interaction
+        proxy: Proxy the session uses, for per-proxy statistics
+        stats: CaptchaStats instance to record the outcome in
+        pool: ProxyPool instance whose challenge rate for the proxy is updated
+        max_attempts: Maximum number of click attempts
+        backoff: Base wait in seconds after a click
+
+    Returns:
+        bool: True if no challenge was present or it was solved, False otherwise
+    """
+    start = time.time()
+    marker = detect_challenge(sb)
+    if not marker:
+        if pool:
+            pool.record_challenge(proxy, challenged=False)
+        if stats:
+            stats.record(proxy, challenged=False)
+        return True
+
+    # An unreadable page is handled like a challenge, but only a confirmed one is counted
+    if marker == UNKNOWN:
+        print("Could not check the page for a captcha, trying to solve one anyway")
+    else:
+        print(f"Captcha detected ({marker})")
+        if pool:
+            pool.record_challenge(proxy, challenged=True)
+    solved = False
+    for attempt in range(max_attempts):
+        try:
+            sb.uc_gui_click_captcha()
+        except Exception as e:
+            print(f"Error clicking captcha (attempt {attempt + 1}): {e}")
+        sb.sleep(backoff * 2 ** attempt)
+        result = detect_challenge(sb, wait=backoff)
+        if result is None:
+            solved = True
+            break
+        if result == UNKNOWN:
+            print(f"Could not check whether the captcha was solved (attempt {attempt + 1})")
+
+    latency = time.time() - start
+    if solved:
+        print(f"Captcha solved in {latency:.1f}s after {attempt + 1} attempt(s)")
+    else:
+        print(f"Captcha not confirmed solved after {max_attempts} attempts")
+    if stats and marker != UNKNOWN:
+        stats.record(proxy, challenged=True, solved=solved, latency=latency)
+    return solved
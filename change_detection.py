@@ -0,0 +1,84 @@
+import hashlib
+import json
+from state import load_json, save_json_atomic, state_path
+
+DEFAULT_HASH_PATH = state_path("job_hashes.json")
+
+# Fields that describe a job's content; relative dates and Gemini output are left out
+HASHED_FIELDS = [
+    "title",
+    "description",
+    "payment_verified",
+    "rating",
+    "total_feedback",
+    "total_spent",
+    "location",
+    "job_type",
+    "experience_level",
+    "estimated_time",
+    "skills",
+    "proposals",
+    "screening_questions",
+    "client_history",
+    "connects",
+]
+
+
+def _normalize(value):
+    if value is None:
+        return ""
+    if isinstance(value, (list, tuple)):
+        return sorted(_normalize(item) for item in value)
+    return " ".join(str(value).split()).lower()
+
+
+def job_hash(job):
+    """
+    Compute a content hash over the normalized job fields.
+
+    Args:
+        job: Job dictionary
+
+    Returns:
+        str: Hex digest that only changes when the job's content changes
+    """
+    normalized = {field: _normalize(job.get(field)) for field in HASHED_FIELDS}
+    payload = json.dumps(normalized, sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def content_fields(job):
+    """
+    Return only the job_uid and content fields of a job, for partial updates.
+    """
+    payload = {"job_uid": job["job_uid"]}
+    payload.update({field: job[field] for field in HASHED_FIELDS if field in job})
+    return payload
+
+
+class JobHashStore:
+    def __init__(self, path=DEFAULT_HASH_PATH, max_entries=5000):
+        """
+        Initialize the local store of job content hashes.
+
+        Args:
+            path: JSON file mapping job_uid to the hash last sent to NocoDB
+            max_entries: Number of most recently stored hashes to keep
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.hashes = load_json(self.path, {}, "job hashes")
+
+    def is_unchanged(self, job):
+        return self.hashes.get(job.get("job_uid")) == job_hash(job)
+
+    def update(self, jobs):
+        for job in jobs:
+            # Re-insert so the dict order tracks recency for pruning
+            self.hashes.pop(job["job_uid"], None)
+            self.hashes[job["job_uid"]] = job_hash(job)
+
+    def save(self):
+        if len(self.hashes) > self.max_entries:
+            self.hashes = dict(list(self.hashes.items())[-self.max_entries:])
+        save_json_atomic(self.path, self.hashes, "job hashes")
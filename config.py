@@ -0,0 +1,88 @@
+import os
+
+
+class Config:
+    def __init__(self):
+        """
+        Settings read from the environment (and .env) on first access.
+
+        Nothing is read at import time, so commands that never open a
+        browser do not need the browser secrets to be set.
+        """
+        self._loaded = False
+
+    def _load(self):
+        if self._loaded:
+            return
+        try:
+            from dotenv import load_dotenv
+            load_dotenv()  # Load environment variables from .env file
+        except ImportError:
+            pass
+        self._loaded = True
+
+    def get(self, name, default=None):
+        """
+        Return a setting, treating an empty value like a missing one.
+
+        CI passes unset repository variables as empty strings.
+        """
+        self._load()
+        value = os.getenv(name)
+        return default if value is None or value == "" else value
+
+    def require(self, name):
+        """
+        Return a required setting, raising KeyError if it is missing or empty.
+        """
+        value = self.get(name)
+        if not value:
+            raise KeyError(f"Missing required environment variable {name}")
+        return value
+
+    def flag(self, name, default=False):
+        value = self.get(name)
+        if value is None:
+            return default
+        return value.strip().lower() in ("1", "true", "yes", "on")
+
+    def list(self, name, separators=","):
+        value = self.get(name, "")
+        for separator in separators[1:]:
+            value = value.replace(separator, separators[0])
+        return [item.strip() for item in value.split(separators[0]) if item.strip()]
+
+    @property
+    def upwork_email(self):
+        return self.require("UPWORK_EMAIL")
+
+    @property
+    def upwork_password(self):
+        return self.require("UPWORK_PASSWORD")
+
+    @property
+    def upwork_search_url(self):
+        return self.require("UPWORK_SEARCH_URL")
+
+    @property
+    def upwork_security_answer(self):
+        return self.require("UPWORK_SECURITY_QUESTION_ANSWER")
+
+    @property
+    def nocodb_table(self):
+        return self.require("NOCODB_TABLE_MARKETING")
+
+    @property
+    def nocodb_token(self):
+        return self.require("NOCODB_TOKEN")
+
+    @property
+    def gemini_api_key(self):
+        return self.require("GEMINI_API_KEY")
+
+    @property
+    def resume(self):
+        return self.get("RESUME")
+
+
+config = Config()
@@ -1,17 +1,14 @@
 import requests
 import json
 from datetime import datetime
-import os
-from dotenv import load_dotenv
+from config import config
 
-load_dotenv()  # Load environment variables from .env file
-
-def test_gemini_api(jobs):
+def test_gemini_api(jobs, timeout=120):
     url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent"
-    api_key = os.environ['GEMINI_API_KEY'] or os.getenv("GEMINI_API_KEY")
+    api_key = config.gemini_api_key
     
     # Resume Summary
-    resume_summary = os.getenv("RESUME")
+    resume_summary = config.resume
 
     # Job Listings
     job_listings = jobs
@@ -51,7 +48,8 @@ Ensure the JSON is well-formed and can be parsed without errors.
     }
     
     try:
-        response = requests.post(url, headers=headers, params=params, json=data)
+        # A hung request becomes a failure the scoring queue can back off and retry
+        response = requests.post(url, headers=headers, params=params, json=data, timeout=timeout)
         print(f"Status Code: {response.status_code}")
         response_json = response.json()
         
@@ -1,39 +1,100 @@
 # https://github.com/2captcha/2captcha-python
 
-import time
+import argparse
+import subprocess
 import sys
-import os
-import json
-from datetime import datetime
-from seleniumbase import SB
-from selenium.webdriver.common.by import By
-from job_extractor import extract_posted_date, extract_job_data
-from auth import login
-from nocodb_client import default_client
-from dotenv import load_dotenv
+import time
+from config import config
+
+# Modules each subcommand imports when it runs; bench times them in a fresh interpreter
+COMMAND_IMPORTS = {
+    "scrape": [
+        "seleniumbase", "job_extractor", "job_details", "resource_blocking",
+        "captcha", "proxy_pool", "run_archive", "auth", "nocodb_client", "browser_supervisor",
+    ],
+    "score": ["scoring_worker", "nocodb_client"],
+    "flush": ["nocodb_client"],
+    "cleanup": ["nocodb_client"],
+}
+BROWSER_COMMANDS = {"scrape"}
+
+
+def record_load(pool, proxy, stats):
+    if stats and stats.get('load_ms'):
+        pool.record_load(proxy, stats['load_ms'] / 1000)
+
+
+def run_scrape(args):
+    from captcha import CaptchaStats
+    from proxy_pool import ProxyPool
+    from resource_blocking import ResourceBlocker
+
+    url = config.upwork_search_url
+    
+    blocker = ResourceBlocker.from_env()
+    captcha_stats = CaptchaStats()
+    pool = ProxyPool.from_env()
+    # Sticky per account so the login stays tied to one exit node
+    proxy = pool.acquire(config.upwork_email)
+    
+    try:
+        if scrape_session(url, proxy, blocker, captcha_stats, pool):
+            pool.record_success(proxy)
+    except Exception as e:
+        pool.record_failure(proxy, e)
+        raise
+    finally:
+        pool.save()
+        pool.report()
+        captcha_stats.save()
+        captcha_stats.report()
 
 
+def scrape_session(url, proxy, blocker, captcha_stats, pool):
+    """
+    Run one scrape session through the given proxy.
+    
+    Returns:
+        bool: True if jobs were extracted, False if the session failed
+    """
+    from auth import login
+    from browser_supervisor import BrowserSupervisor
+    from captcha import handle_captcha
+    from job_details import enrich_jobs
+    from job_extractor import extract_job_data
+    from nocodb_client import get_default_client
+    from run_archive import archive_jobs
 
-def main():
-    load_dotenv()  # Load environment variables from .env file
-    url = os.environ['UPWORK_SEARCH_URL'] or os.getenv('UPWORK_SEARCH_URL')
+    supervisor = BrowserSupervisor(
+        dict(uc=True, test=True, locale="en", proxy=proxy, **blocker.sb_kwargs()),
+        max_pss_mb=int(config.get('BROWSER_MAX_PSS_MB', '1500')),
+        max_pages=int(config.get('BROWSER_MAX_PAGES', '50')),
+        # A recycled or restarted session reopens Upwork and can be challenged again
+        on_start=lambda sb: handle_captcha(sb, proxy=proxy, stats=captcha_stats, pool=pool),
+    )
     
-    with SB(uc=True, test=True, locale="en") as sb:
-        sb.uc_open_with_reconnect(url, 8)
-        sb.uc_gui_click_captcha()
-        sb.sleep(2)
+    with supervisor:
+        record_load(pool, proxy, supervisor.run("open search page", blocker.open, url, 8))
+        supervisor.page_loaded()
+        sb = supervisor.sb
+        handle_captcha(sb, proxy=proxy, stats=captcha_stats, pool=pool)
 
 
         
-        # First try to login
-        if not login(sb):
+        # First try to login; login and captcha pages are on the blocker's allowlist
+        logged_in = login(sb)
+        if not logged_in:
             print("Login failed. Exiting...")
-            return
+            pool.record_failure(proxy, "login failed")
+            return False
             
         print("Navigating to job search...")
-        sb.uc_open_with_reconnect(url, 4)
-        sb.uc_gui_click_captcha()
-        sb.sleep(2)
+        supervisor.check()
+        record_load(pool, proxy, supervisor.run("open search page", blocker.open, url, 4))
+        supervisor.page_loaded()
+        sb = supervisor.sb
+        if not handle_captcha(sb, proxy=proxy, stats=captcha_stats, pool=pool):
+            print("Captcha was not solved, trying to extract jobs anyway...")
 
 
         
@@ -46,24 +107,161 @@ def main():
             
         # Extract job data
         print("Extracting job data...")
-        jobs = extract_job_data(sb)
+        jobs = supervisor.run("extract job data", extract_job_data)
         
         if not jobs:
             print("No jobs were successfully extracted. Exiting...")
-            return
+            pool.record_failure(proxy, "no jobs extracted")
+            return False
             
         # Filter high-rated jobs
         high_rated_jobs = [job for job in jobs if job.get("rating") and float(job["rating"]) > 4.2]
         print(f"Found {len(high_rated_jobs)} high-rated jobs out of {len(jobs)} total jobs")
 
+        # Optionally replace truncated tile descriptions with the full detail pages
+        if config.flag('ENRICH_JOB_DETAILS'):
+            print("Enriching jobs with detail pages...")
+            sb = supervisor.check()
+            try:
+                # Every wave counts its pages and lets the supervisor recycle the session
+                with supervisor.watch("enrich job details"):
+                    enrich_jobs(sb, high_rated_jobs, max_tabs=int(config.get('ENRICH_MAX_TABS', '3')),
+                                on_wave=supervisor.after_pages)
+            except Exception as e:
+                # Enrichment is optional; the jobs still go out with their tile descriptions
+                print(f"Error enriching jobs, sending them without details: {e}")
+
         # Send high-rated jobs to Nocodb
-        default_client.send_jobs(high_rated_jobs)
+        get_default_client().send_jobs(high_rated_jobs)
+
+        # Keep every extracted job for analytics; the scoring worker archives the scores
+        archive_jobs(jobs)
+
+        # Measure the search page once more without blocking, so every run reports both modes
+        if blocker.installed:
+            try:
+                supervisor.check()
+                supervisor.run("open baseline search page", blocker.compare, url)
+                supervisor.page_loaded()
+            except Exception as e:
+                # The measurement is optional; the jobs were already sent
+                print(f"Error measuring the unblocked baseline: {e}")
+        blocker.report()
         
 
 
         # Keep browser open for inspection
         print("Keeping browser open for inspection...")
-        sb.sleep(10)  # Adjust time as needed
+        supervisor.sb.sleep(10)  # Adjust time as needed
+        return True
+
+def run_score(args):
+    from nocodb_client import get_default_client
+    from scoring_worker import run_worker
+
+    client = get_default_client()
+    run_worker(
+        client,
+        concurrency=args.concurrency,
+        batch_size=args.batch_size,
+        max_attempts=args.max_attempts,
+        backoff=args.backoff,
+    )
+    client.score_queue.close()
+
+
+def run_flush(args):
+    from nocodb_client import get_default_client
+
+    result = get_default_client().flush_outbox(batch_size=args.batch_size)
+    if result["pending"]:
+        sys.exit(1)
+
+
+def run_cleanup(args):
+    from nocodb_client import get_default_client
+
+    if not get_default_client().cleanup_old_records(max_rows=args.max_rows):
+        sys.exit(1)
+
+
+def measure_startup(command, top=0):
+    """
+    Time interpreter startup plus the imports of a subcommand in a fresh process.
+    
+    Returns:
+        dict: Wall time in ms, the slowest imports, and an error if the imports failed
+    """
+    code = "import go\nfor module in go.COMMAND_IMPORTS[%r]: __import__(module)" % command
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True)
+    wall_ms = (time.perf_counter() - start) * 1000
+
+    # -X importtime lines look like "import time:  self [us] | cumulative | package"
+    imports = []
+    for line in result.stderr.splitlines():
+        parts = line.split("|")
+        if line.startswith("import time:") and len(parts) == 3 and parts[1].strip().isdigit():
+            imports.append((int(parts[1]), parts[2].strip()))
+    imports.sort(reverse=True)
+    error = result.stderr.strip().splitlines()[-1] if result.returncode else None
+    return {"wall_ms": wall_ms, "slowest": imports[:top], "error": error}
+
+
+def run_bench(args):
+    failed = False
+    print("Subcommand startup (interpreter + imports):")
+    for command in COMMAND_IMPORTS:
+        stats = measure_startup(command, top=args.top)
+        if stats["error"]:
+            print(f"  {command}: imports failed ({stats['error']})")
+            failed = failed or command not in BROWSER_COMMANDS
+            continue
+        over = command not in BROWSER_COMMANDS and args.max_ms and stats["wall_ms"] > args.max_ms
+        print(f"  {command}: {stats['wall_ms']:.0f} ms{' (over limit)' if over else ''}")
+        for cumulative_us, module in stats["slowest"]:
+            print(f"      {cumulative_us / 1000:7.1f} ms  {module}")
+        failed = failed or over
+    if failed:
+        sys.exit(1)
+
+
+COMMANDS = {
+    "scrape": run_scrape,
+    "score": run_score,
+    "flush": run_flush,
+    "cleanup": run_cleanup,
+    "bench": run_bench,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scrape Upwork jobs and sync them to NocoDB")
+    subparsers = parser.add_subparsers(dest="command")
+
+    subparsers.add_parser("scrape", help="Open the browser, extract jobs and send them (default)")
+
+    score = subparsers.add_parser("score", help="Score queued jobs with Gemini")
+    score.add_argument("--concurrency", type=int, default=2)
+    score.add_argument("--batch-size", type=int, default=10)
+    score.add_argument("--max-attempts", type=int, default=5)
+    score.add_argument("--backoff", type=float, default=60)
+
+    flush = subparsers.add_parser("flush", help="Drain the local outbox to NocoDB")
+    flush.add_argument("--batch-size", type=int, default=100)
+
+    cleanup = subparsers.add_parser("cleanup", help="Delete the oldest NocoDB rows")
+    cleanup.add_argument("--max-rows", type=int, default=100)
+
+    bench = subparsers.add_parser("bench", help="Measure startup time of each subcommand")
+    bench.add_argument("--max-ms", type=float, default=1000,
+                       help="Fail if a non-browser subcommand starts slower than this")
+    bench.add_argument("--top", type=int, default=5, help="Show the N slowest imports per subcommand")
+
+    # Unknown options such as --debug are left in sys.argv for SeleniumBase to read
+    args, _ = parser.parse_known_args(argv)
+    COMMANDS[args.command or "scrape"](args)
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,225 @@
+import re
+import time
+from datetime import datetime
+from selenium.webdriver.common.by import By
+from state import load_json, save_json_atomic, state_path
+
+DEFAULT_CACHE_PATH = state_path("job_details.json")
+
+# Selectors tried in order on the job detail page; the first match wins
+DESCRIPTION_SELECTORS = [
+    'div[data-test="Description"]',
+    'section[data-test="Description"]',
+    'div[data-test="job-description-text"]',
+]
+QUESTION_SELECTORS = [
+    'section[data-test="Questions"] li',
+    'div[data-test="Questions"] li',
+    'ol[data-test="screening-questions"] li',
+]
+CLIENT_HISTORY_SELECTORS = [
+    'div[data-test="about-client-container"]',
+    'section[data-test="about-client-container"]',
+    'div[data-test="AboutClientUser"]',
+]
+CONNECTS_SELECTORS = [
+    'div[data-test="ConnectsAuction"]',
+    'div[data-test="ConnectsDesktop"]',
+    'div[data-test="connects-auction"]',
+]
+CONNECTS_PATTERN = re.compile(r"(\d+)\s+(?:required\s+)?Connects?", re.IGNORECASE)
+
+
+class JobDetailCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=2000):
+        """
+        Initialize the detail cache.
+
+        Args:
+            path: JSON file where fetched job details are stored, keyed by job_uid
+            max_entries: Number of most recently fetched jobs to keep
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.details = load_json(self.path, {}, "job detail cache")
+        if self.details:
+            print(f"Loaded {len(self.details)} cached job details")
+
+    def get(self, job_uid):
+        return self.details.get(job_uid)
+
+    def set(self, job_uid, details):
+        # Re-insert so the dict order tracks recency for pruning
+        self.details.pop(job_uid, None)
+        self.details[job_uid] = details
+
+    def save(self):
+        """
+        Write the cache to disk atomically, keeping only the newest max_entries jobs.
+        """
+        if len(self.details) > self.max_entries:
+            self.details = dict(list(self.details.items())[-self.max_entries:])
+        save_json_atomic(self.path, self.details, "job detail cache")
+
+
+def _first_text(driver, selectors):
+    for selector in selectors:
+        elements = driver.find_elements(By.CSS_SELECTOR, selector)
+        if elements:
+            text = elements[0].text.strip()
+            if text:
+                return text
+    return None
+
+
+def extract_job_details(sb):
+    """
+    Extract the full job details from the job detail page in the current tab.
+
+    Args:
+        sb: SeleniumBase instance for browser interaction
+
+    Returns:
+        dict: Dictionary with description, screening_questions, client_history and connects
+    """
+    driver = sb.driver
+    details = {}
+
+    details['description'] = _first_text(driver, DESCRIPTION_SELECTORS)
+
+    questions = []
+    for selector in QUESTION_SELECTORS:
+        questions = [q.text.strip() for q in driver.find_elements(By.CSS_SELECTOR, selector) if q.text.strip()]
+        if questions:
+            break
+    details['screening_questions'] = questions
+
+    client_history = _first_text(driver, CLIENT_HISTORY_SELECTORS)
+    # Collapse the multi-line client card into a single line for NocoDB
+    details['client_history'] = " | ".join(
+        line.strip() for line in client_history.splitlines() if line.strip()
+    ) if client_history else None
+
+    connects_text = _first_text(driver, CONNECTS_SELECTORS) or ""
+    connects_match = CONNECTS_PATTERN.search(connects_text)
+    details['connects'] = int(connects_match.group(1)) if connects_match else None
+
+    return details
+
+
+def _close_tab(driver, handle):
+    try:
+        driver.switch_to.window(handle)
+        driver.close()
+    except Exception:
+        pass
+
+
+def _fetch_wave(sb, wave, timeout):
+    """
+    Open every job in the wave in its own tab, let them load concurrently,
+    then extract each one and close its tab.
+    """
+    driver = sb.driver
+    origin_handle = driver.current_window_handle
+    opened = []
+    fetched = {}
+
+    for job in wave:
+        handle = None
+        try:
+            driver.switch_to.new_window("tab")
+            handle = driver.current_window_handle
+            # Assigning location does not block like driver.get, so the tabs load in parallel
+            driver.execute_script("window.location.href = arguments[0];", job['job_url'])
+            opened.append((handle, job))
+        except Exception as e:
+            print(f"Error opening detail tab for {job.get('job_uid')}: {e}")
+            # Close the tab that failed to navigate so it does not stay the current window
+            if handle:
+                _close_tab(driver, handle)
+            driver.switch_to.window(origin_handle)
+
+    for handle, job in opened:
+        job_uid = job.get('job_uid')
+        try:
+            driver.switch_to.window(handle)
+            sb.wait_for_element(", ".join(DESCRIPTION_SELECTORS), timeout=timeout)
+            details = extract_job_details(sb)
+            if details.get('description'):
+                details['fetched_at'] = datetime.now().isoformat(timespec="seconds")
+                fetched[job_uid] = details
+                print(f"Fetched details for {job_uid}: {len(details['description'])} characters")
+            else:
+                print(f"No description found on detail page for {job_uid}")
+        except Exception as e:
+            print(f"Error fetching details for {job_uid}: {e}")
+        finally:
+            _close_tab(driver, handle)
+
+    driver.switch_to.window(origin_handle)
+    return fetched
+
+
+def apply_job_details(job, details):
+    """
+    Merge fetched details into a job, replacing the truncated tile description.
+    """
+    if details.get('description'):
+        job['description'] = details['description']
+    job['screening_questions'] = details.get('screening_questions') or []
+    job['client_history'] = details.get('client_history')
+    job['connects'] = details.get('connects')
+    return job
+
+
+def enrich_jobs(sb, jobs, max_tabs=3, timeout=20, cache=None, on_wave=None):
+    """
+    Enrich jobs with data from their detail pages.
+
+    Jobs already in the cache are never fetched again. The rest are fetched
+    in waves of at most max_tabs concurrently loading tabs.
+
+    Args:
+        sb: SeleniumBase instance for browser interaction
+        jobs: List of job dictionaries (modified in place)
+        max_tabs: Maximum number of detail pages loading at the same time
+        timeout: Seconds to wait for each detail page to render
+        cache: JobDetailCache instance (default: the cache in the state directory)
+        on_wave: Callable taking the number of pages the wave loaded and
+            returning the sb to use next, e.g. BrowserSupervisor.after_pages
+
+    Returns:
+        list: The same list of jobs, enriched where details were available
+    """
+    cache = cache or JobDetailCache()
+    max_tabs = max(1, max_tabs)
+
+    to_fetch = []
+    for job in jobs:
+        job_uid = job.get('job_uid')
+        cached = cache.get(job_uid) if job_uid else None
+        if cached:
+            apply_job_details(job, cached)
+        elif job_uid and job.get('job_url'):
+            to_fetch.append(job)
+
+    print(f"Job details: {len(jobs) - len(to_fetch)} cached or skipped, {len(to_fetch)} to fetch")
+
+    start = time.time()
+    for i in range(0, len(to_fetch), max_tabs):
+        wave = to_fetch[i:i + max_tabs]
+        fetched = _fetch_wave(sb, wave, timeout)
+        for job in wave:
+            details = fetched.get(job['job_uid'])
+            if details:
+                cache.set(job['job_uid'], details)
+                apply_job_details(job, details)
+        # Save after every wave so a crash mid-run keeps what was already fetched
+        cache.save()
+        if on_wave:
+            sb = on_wave(len(wave))
+
+    if to_fetch:
+        print(f"Fetched {len(to_fetch)} detail pages in {time.time() - start:.1f}s")
+    return jobs
@@ -0,0 +1,204 @@
+import bisect
+import hashlib
+import re
+from array import array
+from itertools import combinations
+from state import load_json, save_json_atomic, state_path
+
+DEFAULT_INDEX_PATH = state_path("simhash_index.json")
+
+FINGERPRINT_BITS = 64
+# The fingerprint is split into 8 blocks of 8 bits. Two fingerprints at most
+# 6 bits apart leave at least 2 blocks untouched, so for one of the 28 block
+# pairs both blocks match exactly (Manku et al., "Detecting Near-Duplicates
+# for Web Crawling"). Each pair has a table keyed on those 16 bits.
+BLOCKS = 8
+BLOCK_BITS = FINGERPRINT_BITS // BLOCKS
+BLOCK_MASK = (1 << BLOCK_BITS) - 1
+# Block order of each table: its two key blocks first, then the others
+TABLE_ORDERS = [
+    (first, second) + tuple(index for index in range(BLOCKS) if index not in (first, second))
+    for first, second in combinations(range(BLOCKS), 2)
+]
+KEY_SHIFT = FINGERPRINT_BITS - 2 * BLOCK_BITS
+
+# Gemini output copied from the original job to a repost
+MATCH_FIELDS = ["relevant", "match_score", "matching_skills", "score_explanation"]
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def _features(job):
+    """
+    Weighted features of a job: title and description word pairs plus skills.
+    """
+    features = {}
+    for field, weight in (("title", 3), ("description", 1)):
+        words = TOKEN_PATTERN.findall((job.get(field) or "").lower())
+        for pair in zip(words, words[1:]):
+            key = " ".join(pair)
+            features[key] = features.get(key, 0) + weight
+        if len(words) == 1:
+            features[words[0]] = features.get(words[0], 0) + weight
+    for skill in job.get("skills") or []:
+        key = f"skill:{skill.strip().lower()}"
+        features[key] = features.get(key, 0) + 2
+    return features
+
+
+def simhash(job):
+    """
+    Compute a 64-bit SimHash fingerprint over the job's title, description and skills.
+
+    Args:
+        job: Job dictionary
+
+    Returns:
+        int: Fingerprint; near-identical jobs differ in only a few bits
+    """
+    # Each feature hash becomes a 64-character bit string, repeated by its weight.
+    # A bit is set if it is "1" in more than half of the strings, counted with
+    # one C-level slice per bit position instead of a Python loop per feature.
+    bits = "".join(
+        format(int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big"), "064b")
+        * weight
+        for feature, weight in _features(job).items()
+    )
+    count = len(bits) // FINGERPRINT_BITS
+    fingerprint = 0
+    for position in range(FINGERPRINT_BITS):
+        if 2 * bits[position::FINGERPRINT_BITS].count("1") > count:
+            fingerprint |= 1 << (FINGERPRINT_BITS - 1 - position)
+    return fingerprint
+
+
+def _permutations(fingerprint):
+    """
+    Permute the fingerprint once per table, moving the table's two key blocks
+    to the top so that fingerprints sharing them sort next to each other.
+
+    Bits are only moved, so Hamming distances are the same on permuted values.
+    """
+    blocks = [fingerprint >> (index * BLOCK_BITS) & BLOCK_MASK for index in range(BLOCKS)]
+    permuted = []
+    for order in TABLE_ORDERS:
+        value = 0
+        for index in order:
+            value = value << BLOCK_BITS | blocks[index]
+        permuted.append(value)
+    return permuted
+
+
+def _unpermute(value, order):
+    fingerprint = 0
+    for position, index in enumerate(reversed(order)):
+        fingerprint |= (value >> (position * BLOCK_BITS) & BLOCK_MASK) << (index * BLOCK_BITS)
+    return fingerprint
+
+
+class RepostIndex:
+    def __init__(self, path=DEFAULT_INDEX_PATH, max_distance=6, max_entries=20000):
+        """
+        Initialize the repost index.
+
+        Every fingerprint is stored once per table, permuted and kept in a
+        sorted array. A lookup only compares against fingerprints that share
+        a table's 16 key bits, which is a handful of jobs even at 20k entries.
+
+        Args:
+            path: JSON file where fingerprints and match results are persisted
+            max_distance: Maximum Hamming distance for two jobs to count as the same (at most 6)
+            max_entries: Number of most recently added jobs to keep
+        """
+        self.path = path
+        self.max_distance = min(max_distance, BLOCKS - 2)
+        self.max_entries = max_entries
+        self.entries = load_json(self.path, {}, "repost index")
+        self.by_fingerprint = {}
+        columns = [[] for _ in TABLE_ORDERS]
+        for job_uid, entry in self.entries.items():
+            self.by_fingerprint.setdefault(entry["fingerprint"], set()).add(job_uid)
+            for column, value in zip(columns, _permutations(entry["fingerprint"])):
+                column.append(value)
+        self.tables = [array("Q", sorted(column)) for column in columns]
+
+    def find(self, job, fingerprint=None):
+        """
+        Find an earlier job that this one is a repost of.
+
+        Args:
+            job: Job dictionary
+            fingerprint: Precomputed simhash of the job, if available
+
+        Returns:
+            tuple: (original job_uid, index entry), or None if no repost was found
+        """
+        fingerprint = simhash(job) if fingerprint is None else fingerprint
+        job_uid = job.get("job_uid")
+        best = None
+        for order, table, query in zip(TABLE_ORDERS, self.tables, _permutations(fingerprint)):
+            low = query >> KEY_SHIFT << KEY_SHIFT
+            start = bisect.bisect_left(table, low)
+            end = bisect.bisect_left(table, low + (1 << KEY_SHIFT), start)
+            for position in range(start, end):
+                value = table[position]
+                distance = (value ^ query).bit_count()
+                if distance > self.max_distance or (best is not None and distance >= best[0]):
+                    continue
+                candidate_fingerprint = _unpermute(value, order)
+                for candidate in self.by_fingerprint.get(candidate_fingerprint, ()):
+                    entry = self.entries.get(candidate)
+                    # Table values of pruned or re-added jobs stay until the next load and are skipped here
+                    if candidate != job_uid and entry and entry["fingerprint"] == candidate_fingerprint:
+                        best = (distance, candidate)
+                        break
+        if best is None:
+            return None
+        return best[1], self.entries[best[1]]
+
+    def add(self, job, fingerprint=None):
+        """
+        Add a job to the index, storing its Gemini match result if it has one.
+        """
+        job_uid = job.get("job_uid")
+        if not job_uid:
+            return
+        fingerprint = simhash(job) if fingerprint is None else fingerprint
+        match = {field: job[field] for field in MATCH_FIELDS if field in job}
+        previous = self.entries.pop(job_uid, None)
+        if previous and not match:
+            match = previous.get("match") or {}
+        self.entries[job_uid] = {"fingerprint": fingerprint, "match": match}
+        if previous and previous["fingerprint"] == fingerprint:
+            return
+        self.by_fingerprint.setdefault(fingerprint, set()).add(job_uid)
+        for table, value in zip(self.tables, _permutations(fingerprint)):
+            bisect.insort(table, value)
+
+    def annotate_reposts(self, jobs):
+        """
+        Copy the prior match result onto jobs that repost an already scored job.
+
+        Args:
+            jobs: List of job dictionaries (modified in place)
+
+        Returns:
+            tuple: (reposts with the copied result, jobs that still need scoring)
+        """
+        reposts, to_score = [], []
+        for job in jobs:
+            found = self.find(job)
+            if found and found[1].get("match"):
+                original_uid, entry = found
+                job.update(entry["match"])
+                job["repost_of"] = original_uid
+                reposts.append(job)
+                print(f"Job {job.get('job_uid')} is a repost of {original_uid}, reusing its match result")
+            else:
+                to_score.append(job)
+        return reposts, to_score
+
+    def save(self):
+        if len(self.entries) > self.max_entries:
+            self.entries = dict(list(self.entries.items())[-self.max_entries:])
+        save_json_atomic(self.path, self.entries, "repost index")
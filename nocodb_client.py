@@ -1,18 +1,29 @@
 import json
 import requests
 from datetime import datetime
-import os
-from gemini_client import test_gemini_api
+from functools import cached_property
+from config import config
+from outbox import Outbox, DEFAULT_OUTBOX_PATH
+from change_detection import JobHashStore, DEFAULT_HASH_PATH, content_fields
+from near_duplicates import RepostIndex, DEFAULT_INDEX_PATH
+from score_queue import ScoreQueue, DEFAULT_QUEUE_PATH
+
+# Responses that mean NocoDB refused the records themselves; retrying them unchanged never helps
+REJECTED_STATUSES = {400, 413, 422}
 
 class NocodbClient:
-    def __init__(self, base_url, token):
+    def __init__(self, base_url, token, outbox_path=DEFAULT_OUTBOX_PATH, hash_path=DEFAULT_HASH_PATH,
+                 repost_index_path=DEFAULT_INDEX_PATH, queue_path=DEFAULT_QUEUE_PATH):
         """
         Initialize the Nocodb client.
         
         Args:
             base_url: The base URL of the Nocodb API
             token: The authentication token
-            data_dir: Directory to store data files (logs and saved jobs)
+            outbox_path: JSONL spool where results are written before they are sent
+            hash_path: JSON file with the content hash of every job sent
+            repost_index_path: JSON file with the SimHash fingerprints of scored jobs
+            queue_path: SQLite file of the queue feeding the scoring worker
         """
         self.base_url = base_url
         self.headers = {
@@ -25,6 +36,25 @@ class NocodbClient:
             "sort": "-job_uid",
         }
 
+        self.outbox = Outbox(outbox_path)
+        self.hash_path = hash_path
+        self.repost_index_path = repost_index_path
+        self.queue_path = queue_path
+
+    # The local stores are opened on first use so commands like cleanup don't load them
+
+    @cached_property
+    def hashes(self):
+        return JobHashStore(self.hash_path)
+
+    @cached_property
+    def reposts(self):
+        return RepostIndex(self.repost_index_path)
+
+    @cached_property
+    def score_queue(self):
+        return ScoreQueue(self.queue_path)
+
     def cleanup_old_records(self, max_rows=500):
         """
         Delete oldest records if total rows exceed max_rows.
@@ -110,14 +140,21 @@ class NocodbClient:
 
     def send_jobs(self, jobs):
         """
-        Send job data to NocoDB only if they don't already exist in NocoDB.
+        Send new jobs to NocoDB and update existing ones whose content changed.
         Only sends jobs with rating > 4.2.
         
+        New jobs are inserted right away and queued for the scoring worker,
+        except reposts of an already scored job, which reuse its result.
+        Jobs already in NocoDB are
+        compared against their locally stored content hash and only the
+        changed ones are patched, with their content fields only.
+        
         Args:
             jobs: List of job dictionaries to send
             
         Returns:
-            dict: The response from NocoDB
+            dict: Result of the outbox flush, see flush_outbox, plus the
+                number of "unchanged" jobs that were not sent
         """
         # First filter jobs by rating
         high_rated_jobs = [job for job in jobs if job.get("rating") and float(job["rating"]) > 4.2]
@@ -145,57 +182,128 @@ class NocodbClient:
         for uid in list(new_job_uids):
             print(f"  {uid}")
             
-        # Filter out jobs that already exist
+        # Split jobs into new ones and existing ones whose content changed
         new_jobs = [job for job in high_rated_jobs if job.get("job_uid") not in existing_job_uids]
+        existing_jobs = [job for job in high_rated_jobs if job.get("job_uid") in existing_job_uids]
+        changed_jobs = [job for job in existing_jobs if not self.hashes.is_unchanged(job)]
+        unchanged_count = len(existing_jobs) - len(changed_jobs)
         print(f"\nNew jobs after filtering low rated jobs: {len(new_jobs)}")
+        print(f"Existing jobs with changed content: {len(changed_jobs)}")
 
-        #send jobs to Gemini
-        if new_jobs:
-            gemini_response = test_gemini_api(jobs=new_jobs)
-            
-            if gemini_response is not None:
-                # Step 1: Convert Gemini response into a lookup dictionary
-                gemini_lookup = {}
-                # print(f"Gemini response: {gemini_response}")
-                for job in new_jobs:
-                    job_uid = job.get('job_uid')
-                    if job_uid in gemini_response:
-                        gemini_lookup[job_uid] = gemini_response[job_uid]
-                        # print(f"Gemini lookup: {gemini_lookup}")
-                
-                # Step 2: Update new_jobs with Gemini response
-                for job in new_jobs:
-                    job_uid = job.get('job_uid')
-                    if job_uid in gemini_lookup:
-                        job.update(gemini_lookup[job_uid])
-                
-                # # Step 3: Filter out jobs that are not relevant to the resume
-                # new_jobs = [job for job in new_jobs if job.get("relevant")]
-                # print(f"\nNew jobs after filtering relevant jobs: {len(new_jobs)}")
-                # # print(f"New jobs after filtering: {new_jobs}")
-            else:
-                print("No Gemini response received, skipping job filtering")
+        # Reposts of an already scored job copy its result instead of calling Gemini
+        reposts, jobs_to_score = self.reposts.annotate_reposts(new_jobs)
+        print(f"Reposts reusing a previous match result: {len(reposts)}")
 
-        if not new_jobs:
-            print("No new jobs to send.")
-            return None
+        # Scoring happens in scoring_worker.py so the browser run does not wait for Gemini
+        self.score_queue.enqueue(jobs_to_score)
+        self.score_queue.report()
+
+        for job in new_jobs:
+            self.reposts.add(job)
+        self.reposts.save()
+
+        if not new_jobs and not changed_jobs:
+            print("No new or changed jobs to send.")
 
+        # Spool first so the jobs survive a failed request; changed jobs
+        # only carry their content fields so stored scores are left untouched
+        self.outbox.append(new_jobs + [content_fields(job) for job in changed_jobs])
+        # Flushing with nothing new still drains anything left over from a previous failed run
+        result = self.flush_outbox()
+
+        sent_uids = set(result["inserted"]) | set(result["updated"])
+        self.hashes.update(job for job in high_rated_jobs if job["job_uid"] in sent_uids)
+        self.hashes.save()
+        result["unchanged"] = unchanged_count
+        print(f"Sync summary: {unchanged_count} unchanged, {len(result['updated'])} updated, "
+              f"{len(result['inserted'])} inserted")
+        return result
+
+    def find_records(self, job_uids, chunk_size=25):
+        """
+        Look up the NocoDB row Ids of the given job_uids.
+        
+        Args:
+            job_uids: Iterable of job_uids to look up
+            chunk_size: Number of job_uids per request, to keep the URL short
+            
+        Returns:
+            dict: Mapping of job_uid to row Id, or None if a request failed
+        """
+        job_uids = list(job_uids)
+        records = {}
         try:
-            response = requests.post(self.base_url, headers=self.headers, json=new_jobs)
+            for i in range(0, len(job_uids), chunk_size):
+                chunk = job_uids[i:i + chunk_size]
+                params = {
+                    "where": "~or".join(f"(job_uid,eq,{uid})" for uid in chunk),
+                    "fields": "Id,job_uid",
+                    "limit": len(chunk),
+                }
+                response = requests.get(self.base_url, headers=self.headers, params=params)
+                if response.status_code != 200:
+                    print(f"Failed to look up existing jobs. Response: {response.text}")
+                    return None
+                for record in response.json().get('list', []):
+                    records[record['job_uid']] = record['Id']
+            return records
+        except Exception as e:
+            print(f"Error looking up existing jobs: {e}")
+            return None
 
-            if response.status_code == 200:
-                response_json = response.json()
-                print(f"Successfully sent {len(new_jobs)} jobs to NocoDB.")
+    def upsert_jobs(self, jobs):
+        """
+        Insert or update jobs in bulk, keyed on job_uid.
+        
+        Jobs whose job_uid already has a row are sent as one bulk PATCH, the
+        rest as one bulk POST, so sending the same jobs twice never creates
+        duplicate rows.
+        
+        Args:
+            jobs: List of job dictionaries to upsert
+            
+        Returns:
+            dict: Lists of "inserted" and "updated" job_uids, {"rejected": True}
+                if NocoDB refused the records, or None on any other failure
+        """
+        existing = self.find_records(job["job_uid"] for job in jobs)
+        if existing is None:
+            return None
 
-                return response_json
-            else:
-                print(f"Failed to send jobs. Response: {response.text}")
-                return None
+        updates = [dict(job, Id=existing[job["job_uid"]]) for job in jobs if job["job_uid"] in existing]
+        inserts = [job for job in jobs if job["job_uid"] not in existing]
 
+        try:
+            if updates:
+                response = requests.patch(self.base_url, headers=self.headers, json=updates)
+                if response.status_code != 200:
+                    print(f"Failed to update jobs. Response: {response.text}")
+                    return {"rejected": True} if response.status_code in REJECTED_STATUSES else None
+                print(f"Successfully updated {len(updates)} jobs in NocoDB.")
+            if inserts:
+                response = requests.post(self.base_url, headers=self.headers, json=inserts)
+                if response.status_code != 200:
+                    print(f"Failed to send jobs. Response: {response.text}")
+                    return {"rejected": True} if response.status_code in REJECTED_STATUSES else None
+                print(f"Successfully sent {len(inserts)} jobs to NocoDB.")
         except Exception as e:
             print(f"Error sending data: {e}")
             return None
 
+        return {
+            "inserted": [job["job_uid"] for job in inserts],
+            "updated": [job["job_uid"] for job in updates],
+        }
+
+    def flush_outbox(self, batch_size=100):
+        """
+        Drain the local outbox spool to NocoDB.
+        
+        Returns:
+            dict: Lists of "inserted" and "updated" job_uids and the number still "pending"
+        """
+        return self.outbox.flush(self.upsert_jobs, batch_size=batch_size)
+
     def get_jobs(self):
         """
         Get job data from NocoDB.
@@ -218,11 +326,30 @@ class NocodbClient:
             print(f"Error retrieving data: {e}")
             return None
 
-# Create a default client instance
-default_client = NocodbClient(
-    base_url=f"https://app.nocodb.com/api/v2/tables/{os.environ['NOCODB_TABLE_MARKETING']}/records",
-    token=os.environ['NOCODB_TOKEN']
-)
+_default_client = None
+
+
+def get_default_client():
+    """
+    Return the default client, creating it from the environment on first use.
+    
+    Returns:
+        NocodbClient: Client for the NOCODB_TABLE_MARKETING table
+    """
+    global _default_client
+    if _default_client is None:
+        _default_client = NocodbClient(
+            base_url=f"https://app.nocodb.com/api/v2/tables/{config.nocodb_table}/records",
+            token=config.nocodb_token
+        )
+    return _default_client
+
+
+def __getattr__(name):
+    # Keeps "from nocodb_client import default_client" working without building it at import
+    if name == "default_client":
+        return get_default_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Example usage
 if __name__ == "__main__":
@@ -231,5 +358,4 @@ if __name__ == "__main__":
         {"job_uid": "67890", "title": "Data Scientist", "company": "AI Labs"}
     ]
     
-    default_client.send_jobs(jobs_to_send)
-    default_client.save_extracted_jobs(jobs_to_send) 
\ No newline at end of file
+    get_default_client().send_jobs(jobs_to_send) 
\ No newline at end of file
@@ -0,0 +1,176 @@
+import json
+import os
+from datetime import datetime
+from state import state_path
+
+DEFAULT_OUTBOX_PATH = state_path("outbox.jsonl")
+
+
+class Outbox:
+    def __init__(self, path=DEFAULT_OUTBOX_PATH):
+        """
+        Initialize the outbox spool.
+
+        Results are appended here before they are sent to NocoDB, so a failed
+        request never loses them. Later records for the same job_uid are merged
+        over earlier ones, which lets partial updates (e.g. scores) be spooled
+        on their own.
+
+        Args:
+            path: JSONL file used as the append-only spool; rejected jobs go to
+                the .dead.jsonl file next to it
+        """
+        self.path = path
+        self.dead_letter_path = f"{os.path.splitext(path)[0]}.dead.jsonl"
+
+    def append(self, jobs):
+        """
+        Append jobs to the spool and sync them to disk.
+
+        Args:
+            jobs: List of job dictionaries, each with a job_uid
+        """
+        jobs = [job for job in jobs if job.get("job_uid")]
+        if not jobs:
+            return 0
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        queued_at = datetime.now().isoformat(timespec="seconds")
+        with open(self.path, "a", encoding="utf-8") as f:
+            for job in jobs:
+                f.write(json.dumps({"job_uid": job["job_uid"], "queued_at": queued_at, "job": job}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        print(f"Spooled {len(jobs)} jobs to {self.path}")
+        return len(jobs)
+
+    def _read(self):
+        """
+        Read the spool.
+
+        Returns:
+            tuple: (dict of job_uid to merged job, byte offset read up to)
+        """
+        pending = {}
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return pending, 0
+        for line in data.decode("utf-8", errors="replace").splitlines():
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A run killed mid-write can leave a partial last line
+                print("Skipping corrupt outbox record")
+                continue
+            pending.setdefault(record["job_uid"], {}).update(record["job"])
+        return pending, len(data)
+
+    def pending(self):
+        """
+        Return the jobs waiting in the spool, merged per job_uid.
+        """
+        return list(self._read()[0].values())
+
+    def _compact(self, drained_uids, offset):
+        """
+        Rewrite the spool without the drained jobs, keeping anything appended
+        after it was read.
+        """
+        with open(self.path, "rb") as f:
+            data = f.read()
+        kept = []
+        for line in data[:offset].decode("utf-8", errors="replace").splitlines():
+            try:
+                if json.loads(line)["job_uid"] in drained_uids:
+                    continue
+            except (json.JSONDecodeError, KeyError):
+                continue
+            kept.append(line + "\n")
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.writelines(kept)
+            f.write(data[offset:].decode("utf-8", errors="replace"))
+        os.replace(tmp_path, self.path)
+
+    def _dead_letter(self, jobs):
+        """
+        Move jobs NocoDB permanently rejected to the dead-letter file next to the spool.
+        """
+        queued_at = datetime.now().isoformat(timespec="seconds")
+        with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+            for job in jobs:
+                f.write(json.dumps({"job_uid": job["job_uid"], "rejected_at": queued_at, "job": job}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        print(f"Moved {len(jobs)} rejected jobs to {self.dead_letter_path}")
+
+    def _send(self, upsert, batch, result, drained, dead):
+        """
+        Upsert a batch, splitting it in halves while NocoDB rejects it so a
+        bad record only holds back itself.
+
+        Returns:
+            bool: False if the batch hit an outage and the flush should stop
+        """
+        batch_result = upsert(batch)
+        if batch_result is None:
+            return False
+        if batch_result.get("rejected"):
+            if len(batch) == 1:
+                print(f"NocoDB rejected job {batch[0]['job_uid']}")
+                dead.append(batch[0])
+                drained.add(batch[0]["job_uid"])
+                return True
+            middle = len(batch) // 2
+            return (self._send(upsert, batch[:middle], result, drained, dead)
+                    and self._send(upsert, batch[middle:], result, drained, dead))
+        result["inserted"].extend(batch_result["inserted"])
+        result["updated"].extend(batch_result["updated"])
+        drained.update(job["job_uid"] for job in batch)
+        return True
+
+    def flush(self, upsert, batch_size=100):
+        """
+        Drain the spool in batches through an upsert function.
+
+        Jobs stay in the spool until a batch containing them succeeds, so a
+        NocoDB outage only delays them until the next flush. A batch NocoDB
+        rejects is split until the rejected records are isolated; those go to
+        the dead-letter file instead of blocking every later job.
+
+        Args:
+            upsert: Callable taking a list of jobs and returning a dict with
+                "inserted" and "updated" job_uid lists, a dict with "rejected"
+                set if NocoDB refused the batch, or None on an outage
+            batch_size: Number of jobs per request
+
+        Returns:
+            dict: Lists of "inserted", "updated" and "rejected" job_uids and the number of jobs still "pending"
+        """
+        pending, offset = self._read()
+        result = {"inserted": [], "updated": [], "rejected": [], "pending": len(pending)}
+        if not pending:
+            return result
+
+        jobs = list(pending.values())
+        drained = set()
+        dead = []
+        for i in range(0, len(jobs), batch_size):
+            batch = jobs[i:i + batch_size]
+            if not self._send(upsert, batch, result, drained, dead):
+                print(f"Outbox flush stopped, {len(jobs) - len(drained)} jobs left in spool")
+                break
+
+        if dead:
+            # Written before compaction, so a rejected job is always in one of the two files
+            self._dead_letter(dead)
+            result["rejected"] = [job["job_uid"] for job in dead]
+        if drained:
+            self._compact(drained, offset)
+        result["pending"] = len(jobs) - len(drained)
+        print(f"Outbox flush: {len(result['inserted'])} inserted, {len(result['updated'])} updated, "
+              f"{len(result['rejected'])} rejected, {result['pending']} pending")
+        return result
@@ -0,0 +1,217 @@
+import hashlib
+import re
+import time
+from config import config
+from state import load_json, save_json_atomic, state_path
+
+DEFAULT_STATE_PATH = state_path("proxy_pool.json")
+
+# Page loads slower than this many seconds start to weigh a proxy down
+TARGET_LOAD_SECONDS = 10.0
+# Weight of the newest sample in the moving averages
+EWMA_ALPHA = 0.3
+
+
+def proxy_label(proxy):
+    """
+    Return a printable proxy identifier with any credentials removed.
+    """
+    if not proxy:
+        return "direct"
+    return re.sub(r"^[^@]*@", "", proxy)
+
+
+def proxy_key(proxy):
+    """
+    Return a stable key for a proxy that does not contain its credentials.
+
+    Rotating-gateway proxies often differ only in the username, so the label
+    alone is not unique and a short hash of the full string is appended.
+    """
+    digest = hashlib.sha1(proxy.encode("utf-8")).hexdigest()[:8]
+    return f"{proxy_label(proxy)}#{digest}"
+
+
+def _session_key(session):
+    return hashlib.sha1(str(session).encode("utf-8")).hexdigest()[:12]
+
+
+class ProxyPool:
+    def __init__(self, proxies, state_path=DEFAULT_STATE_PATH, cooldown=1800, max_failures=3, min_score=0.25):
+        """
+        Initialize the proxy pool.
+
+        Args:
+            proxies: List of proxy strings ("user:pass@host:port" or "host:port")
+            state_path: JSON file where scores and sticky assignments are persisted
+            cooldown: Base seconds an evicted proxy is kept out of rotation
+            max_failures: Consecutive failures after which a proxy is evicted
+            min_score: Health score below which a proxy is evicted
+        """
+        self.proxies = {proxy_key(p): p for p in proxies if p}
+        self.state_path = state_path
+        self.cooldown = cooldown
+        self.max_failures = max_failures
+        self.min_score = min_score
+        self.state = load_json(self.state_path, {"proxies": {}, "assignments": {}}, "proxy pool state")
+        for key in self.proxies:
+            self.state["proxies"].setdefault(key, {
+                "loads": 0,
+                "avg_load_seconds": None,
+                "checks": 0,
+                "challenge_rate": 0.0,
+                "runs": 0,
+                "failure_rate": 0.0,
+                "consecutive_failures": 0,
+                "evictions": 0,
+                "cooldown_until": 0,
+            })
+
+    @classmethod
+    def from_env(cls):
+        """
+        Build a pool from the PROXIES environment variable (comma or newline separated).
+
+        Without PROXIES, the existing PROXY and MY_PROXY secrets become the pool.
+        """
+        proxies = config.list('PROXIES', separators=",\n")
+        if not proxies:
+            proxies = [proxy for proxy in (config.get('PROXY'), config.get('MY_PROXY')) if proxy]
+        return cls(list(dict.fromkeys(proxies)))
+
+    def _entry(self, proxy):
+        return self.state["proxies"].get(proxy_key(proxy)) if proxy else None
+
+    def score(self, key):
+        """
+        Health score between 0 and 1, higher is better.
+        """
+        entry = self.state["proxies"][key]
+        latency = entry["avg_load_seconds"]
+        latency_factor = 1.0 if latency is None else 1.0 / (1.0 + latency / TARGET_LOAD_SECONDS)
+        return latency_factor * (1.0 - 0.5 * entry["challenge_rate"]) * (1.0 - entry["failure_rate"])
+
+    def is_available(self, key):
+        return self.state["proxies"][key]["cooldown_until"] <= time.time()
+
+    def acquire(self, session):
+        """
+        Return the proxy assigned to a session, assigning the healthiest one if needed.
+
+        Assignments are sticky across runs so that the session's login cookies
+        stay valid; a session only moves when its proxy is evicted.
+
+        Args:
+            session: Identifier of the browser session, e.g. the account email
+
+        Returns:
+            str: The proxy to use, or None when the pool is empty
+        """
+        if not self.proxies:
+            return None
+        session_key = _session_key(session)
+        assigned = self.state["assignments"].get(session_key)
+        if assigned in self.proxies and self.is_available(assigned):
+            return self.proxies[assigned]
+
+        available = [key for key in self.proxies if self.is_available(key)]
+        if not available:
+            # Everything is cooling down; fall back to the one that recovers first
+            available = [min(self.proxies, key=lambda k: self.state["proxies"][k]["cooldown_until"])]
+        best = max(available, key=self.score)
+        self.state["assignments"][session_key] = best
+        print(f"Assigned proxy {proxy_label(self.proxies[best])} to session")
+        return self.proxies[best]
+
+    def record_load(self, proxy, seconds):
+        entry = self._entry(proxy)
+        if entry is None or seconds is None:
+            return
+        entry["loads"] += 1
+        if entry["avg_load_seconds"] is None:
+            entry["avg_load_seconds"] = seconds
+        else:
+            entry["avg_load_seconds"] += EWMA_ALPHA * (seconds - entry["avg_load_seconds"])
+
+    def record_challenge(self, proxy, challenged):
+        entry = self._entry(proxy)
+        if entry is None:
+            return
+        entry["checks"] += 1
+        entry["challenge_rate"] += EWMA_ALPHA * ((1.0 if challenged else 0.0) - entry["challenge_rate"])
+
+    def record_success(self, proxy):
+        entry = self._entry(proxy)
+        if entry is None:
+            return
+        entry["runs"] += 1
+        entry["consecutive_failures"] = 0
+        entry["failure_rate"] += EWMA_ALPHA * (0.0 - entry["failure_rate"])
+        self._check_health(proxy_key(proxy))
+
+    def record_failure(self, proxy, reason=None):
+        entry = self._entry(proxy)
+        if entry is None:
+            return
+        entry["runs"] += 1
+        entry["consecutive_failures"] += 1
+        entry["failure_rate"] += EWMA_ALPHA * (1.0 - entry["failure_rate"])
+        print(f"Proxy {proxy_label(proxy)} failed: {reason}")
+        self._check_health(proxy_key(proxy))
+
+    def _check_health(self, key):
+        """
+        Evict a proxy that keeps failing or scores too low, with a cooldown
+        that doubles on every repeated eviction.
+        """
+        entry = self.state["proxies"][key]
+        too_many_failures = entry["consecutive_failures"] >= self.max_failures
+        too_unhealthy = entry["runs"] >= 3 and self.score(key) < self.min_score
+        if not (too_many_failures or too_unhealthy):
+            return
+        cooldown = min(self.cooldown * 2 ** entry["evictions"], 24 * 3600)
+        entry["evictions"] += 1
+        entry["cooldown_until"] = time.time() + cooldown
+        entry["consecutive_failures"] = 0
+        # Scores restart from neutral after the cooldown, so the proxy gets a fair retry
+        entry["failure_rate"] = 0.0
+        entry["challenge_rate"] = 0.0
+        entry["avg_load_seconds"] = None
+        self.state["assignments"] = {
+            session: assigned for session, assigned in self.state["assignments"].items() if assigned != key
+        }
+        print(f"Evicted proxy {proxy_label(self.proxies.get(key, key))} for {cooldown / 60:.0f} minutes")
+
+    def stats(self):
+        """
+        Return per-proxy statistics.
+
+        Returns:
+            dict: Mapping of proxy key to score, latency, challenge and failure rates and availability
+        """
+        stats = {}
+        for key in self.proxies:
+            entry = self.state["proxies"][key]
+            stats[key] = {
+                "score": round(self.score(key), 3),
+                "avg_load_seconds": entry["avg_load_seconds"],
+                "challenge_rate": round(entry["challenge_rate"], 3),
+                "failure_rate": round(entry["failure_rate"], 3),
+                "runs": entry["runs"],
+                "evictions": entry["evictions"],
+                "available": self.is_available(key),
+            }
+        return stats
+
+    def report(self):
+        if not self.proxies:
+            return
+        print("\nProxy pool report:")
+        for key, stats in self.stats().items():
+            latency = f"{stats['avg_load_seconds']:.1f}s" if stats['avg_load_seconds'] is not None else "n/a"
+            status = "available" if stats['available'] else "cooling down"
+            print(f"  {key}: score {stats['score']}, load {latency}, challenge rate {stats['challenge_rate']:.0%}, "
+                  f"failure rate {stats['failure_rate']:.0%}, {status}")
+
+    def save(self):
+        save_json_atomic(self.state_path, self.state, "proxy pool state")
@@ -0,0 +1,285 @@
+import json
+import os
+import re
+from urllib.parse import urlsplit, urlunsplit
+from config import config
+from state import state_path
+
+DEFAULT_EXTENSION_DIR = state_path("resource_blocker")
+
+# URL patterns blocked by the extension's declarativeNetRequest rules ("*" is a wildcard)
+DEFAULT_BLOCKED_PATTERNS = [
+    # Images and avatars
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.avif", "*.ico",
+    "*/profile-portraits/*",
+    # Fonts
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    # Media
+    "*.mp4", "*.webm", "*.mp3",
+    # Analytics and ads
+    "*googletagmanager.com*", "*google-analytics.com*", "*doubleclick.net*",
+    "*googleadservices.com*", "*facebook.net*", "*hotjar.com*", "*segment.com*",
+    "*segment.io*", "*bat.bing.com*", "*licdn.com*", "*clarity.ms*",
+    "*fullstory.com*", "*newrelic.com*", "*nr-data.net*", "*onetrust.com*",
+]
+
+# URL fragments for which blocking is switched off entirely so login and captcha flows keep working
+DEFAULT_ALLOWLIST = [
+    "challenges.cloudflare.com",
+    "/cdn-cgi/challenge-platform",
+    "turnstile",
+    "/ab/account-security",
+    "/login",
+]
+
+# Query parameter that exempts a page from blocking, used to measure the unblocked baseline
+BASELINE_PARAM = "resource_baseline=1"
+
+MEASURE_SCRIPT = """
+const nav = performance.getEntriesByType('navigation')[0];
+const resources = performance.getEntriesByType('resource');
+let bytes = nav ? nav.transferSize : 0;
+for (const r of resources) { bytes += r.transferSize || 0; }
+let loadMs = null;
+if (nav) {
+    const end = nav.loadEventEnd || nav.domContentLoadedEventEnd || nav.responseEnd;
+    loadMs = end - nav.startTime;
+}
+return {url: location.href, bytes: bytes, resources: resources.length, load_ms: loadMs,
+        names: resources.map(r => r.name)};
+"""
+
+
+class ResourceBlocker:
+    def __init__(self, enabled=True, blocked_patterns=None, allowlist=None, block_images_pref=False,
+                 extension_dir=DEFAULT_EXTENSION_DIR):
+        """
+        Initialize the resource blocker.
+
+        Blocking is done by a small extension with declarativeNetRequest rules,
+        loaded when the browser starts. uc_open_with_reconnect opens pages in a
+        new tab while chromedriver is disconnected, so CDP overrides sent to a
+        tab never cover those loads; the extension applies to every tab.
+
+        Args:
+            enabled: Whether blocking is active at all
+            blocked_patterns: URL patterns to block (default: DEFAULT_BLOCKED_PATTERNS)
+            allowlist: URL fragments for which blocking is suspended (default: DEFAULT_ALLOWLIST)
+            block_images_pref: Also pass block_images=True to SB
+            extension_dir: Directory the extension is written to
+        """
+        self.enabled = enabled
+        self.blocked_patterns = list(blocked_patterns or DEFAULT_BLOCKED_PATTERNS)
+        self.allowlist = list(allowlist or DEFAULT_ALLOWLIST)
+        self.block_images_pref = block_images_pref
+        self.extension_dir = extension_dir
+        self.installed = False
+        self.measurements = []
+        self.comparisons = []
+        # declarativeNetRequest urlFilter: "*" is a wildcard, everything else is a literal substring
+        self._blocked_regexes = [
+            re.compile(re.escape(pattern).replace(r"\*", ".*"), re.IGNORECASE) for pattern in self.blocked_patterns
+        ]
+
+    @classmethod
+    def from_env(cls):
+        """
+        Build a blocker from environment variables.
+
+        BLOCK_RESOURCES=0 disables blocking, BLOCKED_URL_PATTERNS and
+        BLOCK_ALLOWLIST add comma-separated entries to the defaults and
+        BLOCK_IMAGES=1 enables the Chrome images preference.
+        """
+        enabled = config.flag('BLOCK_RESOURCES', default=True)
+        return cls(
+            enabled=enabled,
+            blocked_patterns=DEFAULT_BLOCKED_PATTERNS + config.list('BLOCKED_URL_PATTERNS'),
+            allowlist=DEFAULT_ALLOWLIST + config.list('BLOCK_ALLOWLIST'),
+            block_images_pref=enabled and config.flag('BLOCK_IMAGES'),
+        )
+
+    def rules(self):
+        """
+        Build the declarativeNetRequest rules.
+
+        Allow rules have a higher priority than block rules. allowAllRequests
+        on an allowlisted page or frame exempts everything it loads.
+        """
+        rules = []
+
+        def add(priority, action, condition):
+            rules.append({"id": len(rules) + 1, "priority": priority, "action": {"type": action},
+                          "condition": condition})
+
+        for pattern in self.blocked_patterns:
+            add(1, "block", {"urlFilter": pattern, "excludedResourceTypes": ["main_frame"]})
+        for fragment in self.allowlist:
+            add(2, "allowAllRequests", {"urlFilter": fragment, "resourceTypes": ["main_frame", "sub_frame"]})
+            add(2, "allow", {"urlFilter": fragment})
+        add(2, "allowAllRequests", {"urlFilter": BASELINE_PARAM, "resourceTypes": ["main_frame"]})
+        return rules
+
+    def write_extension(self):
+        """
+        Write the blocking extension to extension_dir.
+
+        Returns:
+            str: The extension directory
+        """
+        manifest = {
+            "manifest_version": 3,
+            "name": "Resource blocker",
+            "version": "1.0",
+            "permissions": ["declarativeNetRequest"],
+            "declarative_net_request": {
+                "rule_resources": [{"id": "rules", "enabled": True, "path": "rules.json"}],
+            },
+        }
+        os.makedirs(self.extension_dir, exist_ok=True)
+        with open(os.path.join(self.extension_dir, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        with open(os.path.join(self.extension_dir, "rules.json"), "w", encoding="utf-8") as f:
+            json.dump(self.rules(), f, indent=2)
+        return self.extension_dir
+
+    def sb_kwargs(self):
+        """
+        Extra keyword arguments for SB() that load the blocking at launch.
+        """
+        if not self.enabled:
+            return {}
+        kwargs = {"block_images": True} if self.block_images_pref else {}
+        try:
+            kwargs["extension_dir"] = self.write_extension()
+            self.installed = True
+        except Exception as e:
+            print(f"Error writing resource blocking extension: {e}")
+            self.installed = False
+        return kwargs
+
+    def is_allowlisted(self, url):
+        return any(fragment in (url or "") for fragment in self.allowlist)
+
+    def is_blocking(self, url):
+        """
+        Whether the extension blocks resources on a page with this URL.
+        """
+        return self.installed and not self.is_allowlisted(url) and BASELINE_PARAM not in (url or "")
+
+    def baseline_url(self, url):
+        """
+        Return the URL with the parameter that exempts it from blocking.
+        """
+        parts = urlsplit(url)
+        query = f"{parts.query}&{BASELINE_PARAM}" if parts.query else BASELINE_PARAM
+        return urlunsplit(parts._replace(query=query))
+
+    def open(self, sb, url, reconnect_time=4, label=None):
+        """
+        Open a URL with uc_open_with_reconnect and record load stats.
+        """
+        sb.uc_open_with_reconnect(url, reconnect_time)
+        return self.measure(sb, label or url)
+
+    def measure(self, sb, label):
+        """
+        Record bytes transferred and page load time for the current page.
+
+        The page counts as blocked only if the extension was loaded and the
+        URL the page ended up on is not exempt from blocking. Cross-origin
+        resources without Timing-Allow-Origin report a transferSize of 0, so
+        bytes are a lower bound.
+        """
+        try:
+            stats = sb.execute_script(MEASURE_SCRIPT)
+        except Exception as e:
+            print(f"Error measuring page load: {e}")
+            return None
+        names = stats.pop('names', None) or []
+        stats['label'] = label
+        stats['blocked'] = self.is_blocking(stats.get('url'))
+        if stats['blocked']:
+            self._verify(names)
+            stats['blocked'] = self.installed
+        self.measurements.append(stats)
+        load_ms = stats.get('load_ms')
+        load_text = f"{load_ms / 1000:.2f}s" if load_ms else "n/a"
+        print(f"Page load ({'blocked' if stats['blocked'] else 'unblocked'}): "
+              f"{stats['bytes'] / 1024:.0f} KiB over {stats['resources']} resources, {load_text}")
+        return stats
+
+    def _verify(self, names):
+        """
+        Check that the extension's rules are really active.
+
+        Writing the extension does not mean Chrome loaded it (branded Chrome
+        can ignore --load-extension). Blocked requests never show up as
+        loaded resources, so any resource matching a blocked pattern means
+        the rules are not applied, and every load so far was unblocked.
+        """
+        leaked = [
+            name for name in names
+            if any(regex.search(name) for regex in self._blocked_regexes) and not self.is_allowlisted(name)
+        ]
+        if not leaked:
+            return
+        print(f"Resource blocking is not active: {len(leaked)} blocked resources loaded, e.g. {leaked[0]}")
+        self.installed = False
+        for measurement in self.measurements:
+            measurement['blocked'] = False
+        self.comparisons = []
+
+    def compare(self, sb, url, reconnect_time=4):
+        """
+        Load the URL once more with blocking exempted, so the report has a baseline.
+        """
+        if not self.installed:
+            return None
+        blocked = [m for m in self.measurements if m['label'] == url and m['blocked']]
+        baseline = self.open(sb, self.baseline_url(url), reconnect_time, label=f"{url} (baseline)")
+        if blocked and baseline and not baseline['blocked']:
+            self.comparisons.append((blocked[-1], baseline))
+        return baseline
+
+    def summary(self):
+        """
+        Aggregate the recorded measurements by blocking mode.
+
+        Returns:
+            dict: {"blocked": {...}, "unblocked": {...}} with pages, bytes and avg_load_ms
+        """
+        summary = {}
+        for mode, blocked in (("blocked", True), ("unblocked", False)):
+            pages = [m for m in self.measurements if m['blocked'] == blocked]
+            if not pages:
+                continue
+            load_times = [m['load_ms'] for m in pages if m.get('load_ms')]
+            summary[mode] = {
+                "pages": len(pages),
+                "bytes": sum(m['bytes'] for m in pages),
+                "avg_bytes": sum(m['bytes'] for m in pages) / len(pages),
+                "avg_load_ms": sum(load_times) / len(load_times) if load_times else None,
+            }
+        return summary
+
+    def report(self):
+        """
+        Print the per-mode totals and the savings when both modes were measured.
+        """
+        summary = self.summary()
+        if not summary:
+            print("No page loads measured")
+            return summary
+        print("\nPage load report:")
+        for mode, stats in summary.items():
+            avg_load = f"{stats['avg_load_ms'] / 1000:.2f}s" if stats['avg_load_ms'] else "n/a"
+            print(f"  {mode}: {stats['pages']} pages, {stats['bytes'] / 1024:.0f} KiB total, "
+                  f"{stats['avg_bytes'] / 1024:.0f} KiB/page, avg load {avg_load}")
+        # Savings only compare loads of the same URL, since allowlisted pages differ in size
+        for blocked, baseline in self.comparisons:
+            print(f"  {blocked['label']}:")
+            if baseline['bytes']:
+                print(f"    bytes saved: {1 - blocked['bytes'] / baseline['bytes']:.0%}")
+            if blocked.get('load_ms') and baseline.get('load_ms'):
+                print(f"    load time saved: {1 - blocked['load_ms'] / baseline['load_ms']:.0%}")
+        return summary
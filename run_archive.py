@@ -0,0 +1,298 @@
+import os
+import re
+import uuid
+from datetime import datetime
+from state import state_path
+
+# pyarrow is optional and slow to import, so it is only loaded by _import_pyarrow
+pa = pc = ds = pq = LocalFileSystem = None
+
+DEFAULT_ARCHIVE_DIR = state_path("archive")
+
+# (column, type name) pairs, resolved to pyarrow types by archive_schema
+ARCHIVE_COLUMNS = [
+    ("run_id", "string"),
+    ("scraped_at", "timestamp"),
+    ("job_uid", "string"),
+    ("title", "string"),
+    ("job_url", "string"),
+    ("description", "string"),
+    ("payment_verified", "string"),
+    ("rating", "float64"),
+    ("total_feedback", "string"),
+    ("total_spent", "string"),
+    ("location", "string"),
+    ("job_type", "string"),
+    ("experience_level", "string"),
+    ("estimated_time", "string"),
+    ("proposals", "string"),
+    ("skills", "list"),
+    ("post_date", "string"),
+    ("post_time", "string"),
+    ("connects", "int64"),
+    ("relevant", "bool"),
+    ("match_score", "float64"),
+    ("matching_skills", "list"),
+    ("score_explanation", "string"),
+    ("repost_of", "string"),
+]
+
+
+def _import_pyarrow():
+    """
+    Import pyarrow on first use.
+
+    Returns:
+        bool: True if pyarrow is available
+    """
+    global pa, pc, ds, pq, LocalFileSystem
+    if pa is None:
+        try:
+            import pyarrow
+            import pyarrow.compute
+            import pyarrow.dataset
+            import pyarrow.parquet
+            import pyarrow.fs
+        except ImportError:  # optional dependency, archiving is skipped without it
+            return False
+        pa, pc, ds, pq = pyarrow, pyarrow.compute, pyarrow.dataset, pyarrow.parquet
+        LocalFileSystem = pyarrow.fs.LocalFileSystem
+    return True
+
+
+def archive_schema():
+    types = {
+        "string": pa.string(),
+        "timestamp": pa.timestamp("s"),
+        "float64": pa.float64(),
+        "int64": pa.int64(),
+        "bool": pa.bool_(),
+        "list": pa.list_(pa.string()),
+    }
+    return pa.schema([(name, types[type_name]) for name, type_name in ARCHIVE_COLUMNS])
+
+
+def _to_float(value):
+    if value is None or value == "":
+        return None
+    try:
+        return float(re.sub(r"[^\d.]", "", str(value)))
+    except ValueError:
+        return None
+
+
+def _to_int(value):
+    number = _to_float(value)
+    return int(number) if number is not None else None
+
+
+def _to_bool(value):
+    if isinstance(value, bool) or value is None:
+        return value
+    return str(value).strip().lower() in ("true", "1", "yes")
+
+
+def _row(job, run_id, scraped_at):
+    row = {name: job.get(name) for name, _ in ARCHIVE_COLUMNS}
+    row["run_id"] = run_id
+    row["scraped_at"] = scraped_at
+    row["rating"] = _to_float(job.get("rating"))
+    row["connects"] = _to_int(job.get("connects"))
+    row["match_score"] = _to_float(job.get("match_score"))
+    row["relevant"] = _to_bool(job.get("relevant"))
+    row["skills"] = list(job.get("skills") or [])
+    row["matching_skills"] = list(job.get("matching_skills") or [])
+    return row
+
+
+def archive_jobs(jobs, archive_dir=DEFAULT_ARCHIVE_DIR, run_id=None):
+    """
+    Append a run's jobs to the Parquet archive, partitioned by date.
+
+    Each run writes one zstd-compressed file under date=YYYY-MM-DD/. The
+    first write of a new day compacts the earlier, finished partitions.
+
+    Args:
+        jobs: List of job dictionaries, scored or not
+        archive_dir: Root directory of the archive
+        run_id: Identifier of the run (default: timestamp plus random suffix)
+
+    Returns:
+        str: Path of the written file, or None if nothing was written
+    """
+    if not _import_pyarrow():
+        print("pyarrow is not installed, skipping run archive")
+        return None
+    if not jobs:
+        return None
+
+    scraped_at = datetime.now().replace(microsecond=0)
+    run_id = run_id or f"{scraped_at:%Y%m%d%H%M%S}-{uuid.uuid4().hex[:6]}"
+    try:
+        table = pa.Table.from_pylist([_row(job, run_id, scraped_at) for job in jobs], schema=archive_schema())
+        partition_dir = os.path.join(archive_dir, f"date={scraped_at:%Y-%m-%d}")
+        new_day = not os.path.isdir(partition_dir)
+        os.makedirs(partition_dir, exist_ok=True)
+        path = os.path.join(partition_dir, f"run-{run_id}.parquet")
+        pq.write_table(table, path, compression="zstd")
+        print(f"Archived {len(jobs)} jobs to {path}")
+    except Exception as e:
+        print(f"Error archiving jobs: {e}")
+        return None
+    if new_day:
+        compact_archive(archive_dir, before=f"{scraped_at:%Y-%m-%d}")
+    return path
+
+
+def compact_partition(partition_dir):
+    """
+    Rewrite all files of one date partition into a single compacted.parquet.
+
+    The new file is written under a name the dataset ignores and swapped in
+    before the run files are removed, so readers never see a partial file.
+    A crash between the two steps only leaves duplicate rows, which the
+    readers already drop by job_uid.
+
+    Returns:
+        int: Number of files that were merged, 0 if nothing was done
+    """
+    files = sorted(name for name in os.listdir(partition_dir) if name.endswith(".parquet"))
+    if len(files) < 2:
+        return 0
+    paths = [os.path.join(partition_dir, name) for name in files]
+    table = pa.concat_tables(pq.read_table(path, schema=archive_schema()) for path in paths)
+    tmp_path = os.path.join(partition_dir, "_compacted.tmp")
+    target = os.path.join(partition_dir, "compacted.parquet")
+    pq.write_table(table.sort_by("scraped_at"), tmp_path, compression="zstd")
+    os.replace(tmp_path, target)
+    for path in paths:
+        if path != target:
+            os.remove(path)
+    return len(files)
+
+
+def compact_archive(archive_dir=DEFAULT_ARCHIVE_DIR, before=None):
+    """
+    Compact every finished date partition into one file.
+
+    Each run adds a small file, so without compaction a partition holds one
+    file per run and reads get slower with every file opened.
+
+    Args:
+        archive_dir: Root directory of the archive
+        before: Only compact partitions dated before this "YYYY-MM-DD" (default: today)
+    """
+    if not _import_pyarrow() or not os.path.isdir(archive_dir):
+        return
+    before = before or f"{datetime.now():%Y-%m-%d}"
+    for name in sorted(os.listdir(archive_dir)):
+        if not name.startswith("date=") or name[len("date="):] >= before:
+            continue
+        try:
+            merged = compact_partition(os.path.join(archive_dir, name))
+            if merged:
+                print(f"Compacted {merged} files in {name}")
+        except Exception as e:
+            print(f"Error compacting {name}: {e}")
+
+
+def open_archive(archive_dir=DEFAULT_ARCHIVE_DIR):
+    """
+    Open the archive as a memory-mapped pyarrow dataset.
+
+    Returns:
+        pyarrow.dataset.Dataset: Dataset with the archive columns plus the "date" partition column
+    """
+    if not _import_pyarrow():
+        raise ImportError("pyarrow is required to read the run archive")
+    partitioning = ds.partitioning(pa.schema([("date", pa.string())]), flavor="hive")
+    schema = archive_schema().append(pa.field("date", pa.string()))
+    return ds.dataset(
+        archive_dir,
+        format="parquet",
+        partitioning=partitioning,
+        schema=schema,
+        filesystem=LocalFileSystem(use_mmap=True),
+    )
+
+
+def query(columns=None, start_date=None, end_date=None, filter=None, archive_dir=DEFAULT_ARCHIVE_DIR):
+    """
+    Read archived jobs, loading only the requested columns and partitions.
+
+    Args:
+        columns: List of column names to read (default: all)
+        start_date: First date to include, "YYYY-MM-DD"
+        end_date: Last date to include, "YYYY-MM-DD"
+        filter: Extra pyarrow.compute expression, e.g. pc.field("rating") > 4.8
+        archive_dir: Root directory of the archive
+
+    Returns:
+        pyarrow.Table: The matching rows
+    """
+    if not _import_pyarrow():
+        raise ImportError("pyarrow is required to read the run archive")
+    expression = None
+    if start_date:
+        expression = pc.field("date") >= start_date
+    if end_date:
+        bound = pc.field("date") <= end_date
+        expression = bound if expression is None else expression & bound
+    if filter is not None:
+        expression = filter if expression is None else expression & filter
+    return open_archive(archive_dir).to_table(columns=columns, filter=expression)
+
+
+def latest_per_job(table):
+    """
+    Keep only the most recent row of each job_uid.
+
+    Every run archives every listed job and the scoring worker adds a scored
+    row, so one job appears many times in the archive.
+    """
+    table = table.sort_by("scraped_at")
+    table = table.append_column("_row", pa.array(range(len(table)), pa.int64()))
+    latest = table.group_by("job_uid").aggregate([("_row", "max")])
+    return table.take(latest["_row_max"]).drop_columns(["_row"])
+
+
+def skills_demand(top=20, start_date=None, end_date=None, archive_dir=DEFAULT_ARCHIVE_DIR):
+    """
+    Count in how many distinct jobs each skill appears.
+
+    Returns:
+        list: (skill, count) tuples, most frequent first
+    """
+    table = latest_per_job(query(["job_uid", "scraped_at", "skills"], start_date, end_date, archive_dir=archive_dir))
+    counts = pc.value_counts(pc.list_flatten(table["skills"]))
+    pairs = zip(counts.field("values").to_pylist(), counts.field("counts").to_pylist())
+    return sorted(pairs, key=lambda pair: pair[1], reverse=True)[:top]
+
+
+def score_summary(start_date=None, end_date=None, archive_dir=DEFAULT_ARCHIVE_DIR):
+    """
+    Summarize Gemini scores per day.
+
+    Returns:
+        pyarrow.Table: date, number of scored jobs, mean match_score and relevant count
+    """
+    table = latest_per_job(query(
+        ["job_uid", "scraped_at", "date", "match_score", "relevant"], start_date, end_date,
+        filter=pc.field("match_score").is_valid(), archive_dir=archive_dir,
+    ))
+    table = table.append_column("relevant_count", pc.cast(table["relevant"], pa.int64()))
+    return table.group_by("date").aggregate([
+        ("match_score", "count"),
+        ("match_score", "mean"),
+        ("relevant_count", "sum"),
+    ]).sort_by("date")
+
+
+if __name__ == "__main__":
+    print("Top skills:")
+    for skill, count in skills_demand():
+        print(f"  {skill}: {count}")
+    print("\nScores per day:")
+    for row in score_summary().to_pylist():
+        print(f"  {row['date']}: {row['match_score_count']} scored, "
+              f"mean score {row['match_score_mean']:.1f}, {row['relevant_count_sum']} relevant")
@@ -0,0 +1,151 @@
+import json
+import os
+import sqlite3
+import time
+from state import state_path
+
+DEFAULT_QUEUE_PATH = state_path("score_queue.sqlite3")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_uid TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    enqueued_at REAL NOT NULL,
+    available_at REAL NOT NULL,
+    leased_until REAL,
+    last_error TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_state_available ON jobs (state, available_at);
+"""
+
+
+class ScoreQueue:
+    def __init__(self, path=DEFAULT_QUEUE_PATH):
+        """
+        Initialize the persistent scoring queue.
+
+        Jobs move from pending to in_progress when claimed, and to done or,
+        after too many failed attempts, dead. A claim is a lease: if a worker
+        dies, its jobs become claimable again once the lease expires.
+
+        Args:
+            path: SQLite database file
+        """
+        self.path = path
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def enqueue(self, jobs):
+        """
+        Add jobs to the queue. Jobs whose job_uid was queued before are ignored.
+
+        Returns:
+            int: Number of jobs actually added
+        """
+        now = time.time()
+        rows = [(job["job_uid"], json.dumps(job), now, now, now) for job in jobs if job.get("job_uid")]
+        before = self.conn.total_changes
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO jobs (job_uid, payload, enqueued_at, available_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            rows,
+        )
+        added = self.conn.total_changes - before
+        print(f"Queued {added} jobs for scoring")
+        return added
+
+    def claim(self, batch_size=10, lease_seconds=300):
+        """
+        Claim up to batch_size jobs that are due, oldest first.
+
+        Returns:
+            list: Job dictionaries
+        """
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = self.conn.execute(
+                "SELECT job_uid, payload FROM jobs "
+                "WHERE (state = 'pending' AND available_at <= ?) "
+                "OR (state = 'in_progress' AND leased_until < ?) "
+                "ORDER BY enqueued_at LIMIT ?",
+                (now, now, batch_size),
+            ).fetchall()
+            self.conn.executemany(
+                "UPDATE jobs SET state = 'in_progress', attempts = attempts + 1, "
+                "leased_until = ?, updated_at = ? WHERE job_uid = ?",
+                [(now + lease_seconds, now, row[0]) for row in rows],
+            )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return [json.loads(row[1]) for row in rows]
+
+    def complete(self, job_uids):
+        now = time.time()
+        self.conn.executemany(
+            "UPDATE jobs SET state = 'done', leased_until = NULL, last_error = NULL, updated_at = ? "
+            "WHERE job_uid = ?",
+            [(now, job_uid) for job_uid in job_uids],
+        )
+
+    def fail(self, job_uids, error, max_attempts=5, backoff=60):
+        """
+        Put failed jobs back with exponential backoff, or mark them dead after max_attempts.
+        """
+        now = time.time()
+        for job_uid in job_uids:
+            row = self.conn.execute("SELECT attempts FROM jobs WHERE job_uid = ?", (job_uid,)).fetchone()
+            if row is None:
+                continue
+            attempts = row[0]
+            if attempts >= max_attempts:
+                state, available_at = "dead", now
+            else:
+                state, available_at = "pending", now + backoff * 2 ** (attempts - 1)
+            self.conn.execute(
+                "UPDATE jobs SET state = ?, available_at = ?, leased_until = NULL, last_error = ?, "
+                "updated_at = ? WHERE job_uid = ?",
+                (state, available_at, str(error), now, job_uid),
+            )
+
+    def prune(self, older_than_days=7):
+        """
+        Delete finished jobs older than the given number of days.
+        """
+        cutoff = time.time() - older_than_days * 86400
+        self.conn.execute("DELETE FROM jobs WHERE state IN ('done', 'dead') AND updated_at < ?", (cutoff,))
+
+    def metrics(self):
+        """
+        Return queue depth per state and the age of the oldest waiting job.
+
+        Returns:
+            dict: Counts per state, "depth" (pending plus in_progress) and
+                "oldest_age_seconds" of the oldest job not yet done
+        """
+        metrics = {"pending": 0, "in_progress": 0, "done": 0, "dead": 0}
+        for state, count in self.conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state"):
+            metrics[state] = count
+        metrics["depth"] = metrics["pending"] + metrics["in_progress"]
+        oldest = self.conn.execute(
+            "SELECT MIN(enqueued_at) FROM jobs WHERE state IN ('pending', 'in_progress')"
+        ).fetchone()[0]
+        metrics["oldest_age_seconds"] = round(time.time() - oldest, 1) if oldest else 0.0
+        return metrics
+
+    def report(self):
+        metrics = self.metrics()
+        print(f"Score queue: depth {metrics['depth']} ({metrics['pending']} pending, "
+              f"{metrics['in_progress']} in progress), oldest {metrics['oldest_age_seconds']:.0f}s, "
+              f"{metrics['done']} done, {metrics['dead']} dead")
+        return metrics
+
+    def close(self):
+        self.conn.close()
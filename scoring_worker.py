@@ -0,0 +1,96 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from gemini_client import test_gemini_api
+from near_duplicates import MATCH_FIELDS
+from run_archive import archive_jobs
+
+
+def score_batch(jobs):
+    """
+    Score one batch of jobs with Gemini.
+
+    Returns:
+        tuple: (jobs with their match result merged in, job_uids missing from the response),
+            or None if the request failed
+    """
+    response = test_gemini_api(jobs=jobs)
+    if response is None:
+        return None
+    scored, missing = [], []
+    for job in jobs:
+        match = response.get(job["job_uid"])
+        if match:
+            scored.append(dict(job, **{field: match[field] for field in MATCH_FIELDS if field in match}))
+        else:
+            missing.append(job["job_uid"])
+    return scored, missing
+
+
+def run_worker(client, concurrency=2, batch_size=10, max_attempts=5, backoff=60, max_batches=None):
+    """
+    Drain the scoring queue: score jobs with Gemini and patch the results into NocoDB.
+
+    Up to concurrency batches are sent to Gemini at once. Failed batches go
+    back to the queue with exponential backoff until max_attempts.
+
+    Args:
+        client: NocodbClient whose queue, outbox and repost index are used
+        concurrency: Number of Gemini requests in flight at the same time
+        batch_size: Jobs per Gemini request
+        max_attempts: Attempts before a job is marked dead
+        backoff: Base seconds before a failed job is retried
+        max_batches: Stop after this many batches (default: until the queue is empty)
+
+    Returns:
+        dict: Queue metrics after the run
+    """
+    queue = client.score_queue
+    queue.report()
+    start = time.time()
+    scored_jobs = []
+    batches = 0
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        while max_batches is None or batches < max_batches:
+            claimed = []
+            for _ in range(concurrency):
+                batch = queue.claim(batch_size=batch_size)
+                if not batch:
+                    break
+                claimed.append(batch)
+            if not claimed:
+                break
+            batches += len(claimed)
+
+            # Only the Gemini calls run in threads; queue, outbox and index updates stay on this thread
+            futures = [(batch, executor.submit(score_batch, batch)) for batch in claimed]
+            for batch, future in futures:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = None
+                    print(f"Error scoring batch: {e}")
+                if result is None:
+                    queue.fail([job["job_uid"] for job in batch], "Gemini request failed", max_attempts, backoff)
+                    continue
+                scored, missing = result
+                if missing:
+                    queue.fail(missing, "missing from Gemini response", max_attempts, backoff)
+                # Spool the scores before completing, so they survive a NocoDB failure
+                client.outbox.append([
+                    {"job_uid": job["job_uid"], **{field: job[field] for field in MATCH_FIELDS if field in job}}
+                    for job in scored
+                ])
+                queue.complete(job["job_uid"] for job in scored)
+                for job in scored:
+                    client.reposts.add(job)
+                scored_jobs.extend(scored)
+
+    if scored_jobs:
+        client.reposts.save()
+        client.flush_outbox()
+        archive_jobs(scored_jobs)
+    queue.prune()
+    print(f"Scored {len(scored_jobs)} jobs in {batches} batches in {time.time() - start:.1f}s")
+    return queue.report()
+
@@ -0,0 +1,57 @@
+import json
+import os
+
+# Local state kept between runs. SeleniumBase clears downloaded_files when a
+# browser session starts, so state must not live there.
+STATE_DIR = "state"
+
+
+def state_path(name):
+    return os.path.join(STATE_DIR, name)
+
+
+def load_json(path, default, label):
+    """
+    Load a JSON state file.
+
+    Args:
+        path: File to read
+        default: Value returned if the file is missing or unreadable
+        label: Name of the state used in error messages
+
+    Returns:
+        The parsed JSON, or default
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+    except Exception as e:
+        print(f"Error loading {label}: {e}")
+        return default
+
+
+def save_json_atomic(path, data, label):
+    """
+    Write a JSON state file through a temporary file, so a crash mid-write
+    never leaves a truncated file behind.
+
+    Args:
+        path: File to write
+        data: JSON-serializable value
+        label: Name of the state used in error messages
+
+    Returns:
+        bool: True if the file was written
+    """
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+        return True
+    except Exception as e:
+        print(f"Error saving {label}: {e}")
+        return False
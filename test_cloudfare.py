@@ -1,11 +1,16 @@
-import os
 from seleniumbase import SB
+from captcha import CaptchaStats, handle_captcha
+from proxy_pool import ProxyPool
 
-with SB(uc=True, test=True, proxy=os.environ["PROXY"]) as sb:
+captcha_stats = CaptchaStats()
+pool = ProxyPool.from_env()
+proxy = pool.acquire("test_cloudfare")
+
+with SB(uc=True, test=True, proxy=proxy) as sb:
     url = "https://gitlab.com/users/sign_in"
     sb.activate_cdp_mode(url)
-    sb.uc_gui_click_captcha()
-    sb.sleep(2)
-    sb.uc_gui_click_captcha()
-    sb.sleep(2)
+    handle_captcha(sb, proxy=proxy, stats=captcha_stats, pool=pool)
 
+pool.save()
+captcha_stats.save()
+captcha_stats.report()